@@ -0,0 +1,157 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Hashable
+
+from main import EncryptionResult, decrypt_batch, encrypt_batch
+from rabin import RabinPrivateKey, generate_keys as generate_rabin_keys
+from rsa import RSAKeyPair, generate_rsa_keys
+
+class _MicroBatcher:
+    """
+    Собирает одновременные запросы с общей парой ключей в пакет
+    и выполняет его одним вызовом в исполнителе.
+    """
+
+    def __init__(
+        self,
+        batch_func: Callable[..., list],
+        get_executor: Callable[[], Executor | None],
+        max_batch: int,
+        delay: float
+    ):
+        self.batch_func = batch_func
+        self.get_executor = get_executor
+        self.max_batch = max_batch
+        self.delay = delay
+        self._pending: dict[Hashable, tuple[tuple, list[tuple[Any, asyncio.Future]]]] = {}
+        self._timers: dict[Hashable, asyncio.TimerHandle] = {}
+
+    async def submit(self, group: Hashable, keys: tuple, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        _, batch = self._pending.setdefault(group, (keys, []))
+        batch.append((item, future))
+        if len(batch) >= self.max_batch:
+            self._flush(group)
+        elif len(batch) == 1:
+            self._timers[group] = loop.call_later(self.delay, self._flush, group)
+        return await future
+
+    def _flush(self, group: Hashable) -> None:
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        keys, batch = self._pending.pop(group, ((), []))
+        if not batch:
+            return
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(self.get_executor(), self.batch_func, items, *keys)
+        task.add_done_callback(lambda done: self._resolve(done, futures))
+
+    @staticmethod
+    def _resolve(done: asyncio.Future, futures: list[asyncio.Future]) -> None:
+        if done.exception() is not None:
+            results = [done.exception()] * len(futures)
+        else:
+            results = done.result()
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+class AsyncCrypto:
+    """
+    Асинхронный интерфейс гибридной схемы из main.py.
+    CPU-нагрузка выполняется в исполнителе. По умолчанию это пул процессов,
+    создаваемый при первом запросе: в потоках DES и RSA конкурировали бы за GIL
+    с циклом событий и увеличивали задержку остальных сопрограмм.
+    Одновременные запросы с общей парой ключей объединяются в микропакеты,
+    а число запросов в работе ограничено max_in_flight.
+    Собственный пул закрывается close() или при выходе из async with.
+    """
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        max_in_flight: int = 64,
+        max_batch: int = 32,
+        batch_delay: float = 0.002
+    ):
+        self.executor = executor
+        self._owns_executor = False
+        self._limit = asyncio.Semaphore(max_in_flight)
+        self._encryptor = _MicroBatcher(encrypt_batch, self._get_executor, max_batch, batch_delay)
+        self._decryptor = _MicroBatcher(decrypt_batch, self._get_executor, max_batch, batch_delay)
+
+    def _get_executor(self) -> Executor:
+        """Исполнитель для CPU-нагрузки; пул процессов создаётся при первом обращении"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor()
+            self._owns_executor = True
+        return self.executor
+
+    def close(self) -> None:
+        """Закрывает пул процессов, созданный по умолчанию; переданный исполнитель не закрывается"""
+        if self._owns_executor and self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+            self._owns_executor = False
+
+    async def __aenter__(self) -> "AsyncCrypto":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        self.close()
+
+    async def encrypt(self, plaintext: str, rabin_public_key: int, rsa_key_pair: RSAKeyPair) -> EncryptionResult:
+        """Асинхронно шифрует сообщение"""
+        async with self._limit:
+            group = ("encrypt", rabin_public_key, id(rsa_key_pair))
+            return await self._encryptor.submit(group, (rabin_public_key, rsa_key_pair), plaintext)
+
+    async def decrypt(
+        self,
+        encryption_result: EncryptionResult,
+        rabin_private_key: tuple[int, int, int, int, int] | RabinPrivateKey,
+        rsa_key_pair: RSAKeyPair
+    ) -> str:
+        """Асинхронно дешифрует сообщение"""
+        if isinstance(self._get_executor(), ProcessPoolExecutor) and isinstance(encryption_result.encrypted_message, memoryview):
+            # memoryview нельзя передать в другой процесс
+            encryption_result = encryption_result._replace(
+                encrypted_message=encryption_result.encrypted_message.tobytes()
+            )
+        async with self._limit:
+            group = ("decrypt", id(rabin_private_key), id(rsa_key_pair))
+            return await self._decryptor.submit(group, (rabin_private_key, rsa_key_pair), encryption_result)
+
+    async def generate_rsa_keys(self, bit_length: int = 1024) -> RSAKeyPair:
+        """Асинхронная генерация пары ключей RSA"""
+        async with self._limit:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), generate_rsa_keys, bit_length)
+
+    async def generate_rabin_keys(self, bit_length: int = 512) -> tuple[tuple[int, int, int, int, int], int]:
+        """Асинхронная генерация ключей Рабина"""
+        async with self._limit:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), generate_rabin_keys, bit_length)
+
+if __name__ == "__main__":
+    async def demo() -> None:
+        async with AsyncCrypto() as crypto:
+            (rabin_private, rabin_public), rsa_key_pair = await asyncio.gather(
+                crypto.generate_rabin_keys(), crypto.generate_rsa_keys(1024)
+            )
+            messages = [f"Сообщение {i}" for i in range(100)]
+            encrypted = await asyncio.gather(*(crypto.encrypt(m, rabin_public, rsa_key_pair) for m in messages))
+            decrypted = await asyncio.gather(*(crypto.decrypt(e, rabin_private, rsa_key_pair) for e in encrypted))
+        print(f"Результат соответствует исходным сообщениям: {decrypted == messages}")
+
+    asyncio.run(demo())
@@ -0,0 +1,198 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable
+
+import main
+import rabin
+import rsa
+from desx import DESCryptor, DESXCipher
+
+DEFAULT_SIZES = [64, 1024, 16 * 1024, 256 * 1024, 1024 * 1024]
+FULL_SIZES = DEFAULT_SIZES + [10 * 1024 * 1024, 100 * 1024 * 1024]
+DEFAULT_KEY_BITS = [512, 1024, 2048, 4096]
+
+def percentile(values: list[float], q: float) -> float:
+    """Процентиль q (0..100) с линейной интерполяцией"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def measure(func: Callable[[], Any], repeat: int, warmup: int) -> dict[str, float]:
+    """
+    Запускает func warmup раз без замера, затем repeat раз с замером.
+    Возвращает статистику времени одного запуска в секундах.
+    """
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "runs": repeat,
+        "min": min(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if repeat > 1 else 0.0,
+        "p50": percentile(timings, 50),
+        "p90": percentile(timings, 90),
+        "p99": percentile(timings, 99),
+        "max": max(timings)
+    }
+
+class Suite:
+    """Набор замеров с общими параметрами повторов"""
+
+    def __init__(self, repeat: int, warmup: int, verbose: bool = True):
+        self.repeat = repeat
+        self.warmup = warmup
+        self.verbose = verbose
+        self.results: list[dict[str, Any]] = []
+
+    def run(self, name: str, func: Callable[[], Any], params: dict[str, Any] | None = None,
+            repeat: int | None = None, warmup: int | None = None, nbytes: int | None = None) -> None:
+        repeat = self.repeat if repeat is None else repeat
+        warmup = self.warmup if warmup is None else warmup
+        stats = measure(func, repeat, warmup)
+        if nbytes:
+            stats["mb_per_s"] = nbytes / (1 << 20) / stats["p50"]
+        self.results.append({"name": name, "params": params or {}, "stats": stats})
+        if self.verbose:
+            extra = f", {stats['mb_per_s']:.2f} МБ/с" if nbytes else ""
+            print(f"{name} {params or ''}: p50={stats['p50'] * 1e3:.3f} мс, "
+                  f"p90={stats['p90'] * 1e3:.3f} мс{extra}", file=sys.stderr)
+
+def bench_des(suite: Suite, blocks: int = 1000) -> None:
+    cryptor = DESCryptor(random.getrandbits(64), cache=None)
+    data = [random.getrandbits(64) for _ in range(blocks)]
+    suite.run("des.process_block", lambda: [cryptor.process_block(b) for b in data],
+              {"blocks": blocks}, nbytes=blocks * 8)
+    suite.run("des.key_schedule", lambda: DESCryptor(random.getrandbits(64), cache=None),
+              repeat=max(suite.repeat, 100))
+
+def bench_desx(suite: Suite, sizes: list[int]) -> None:
+    key, k1, k2, iv = (random.getrandbits(64) for _ in range(4))
+    for size in sizes:
+        data = random.randbytes(size)
+        encrypted = DESXCipher(key, k1, k2, iv).encrypt(data)
+        # Большие размеры замеряются меньшее число раз
+        repeat = suite.repeat if size <= 1 << 20 else 1
+        warmup = suite.warmup if size <= 1 << 20 else 0
+        suite.run("desx.encrypt", lambda: DESXCipher(key, k1, k2, iv).encrypt(data),
+                  {"size": size}, repeat, warmup, nbytes=size)
+        suite.run("desx.decrypt", lambda: DESXCipher(key, k1, k2, iv).decrypt(encrypted),
+                  {"size": size}, repeat, warmup, nbytes=size)
+
+def bench_rsa(suite: Suite, key_bits: list[int], keygen_repeat: int) -> None:
+    for bits in key_bits:
+        suite.run("rsa.generate_keys", lambda: rsa.generate_rsa_keys(bits),
+                  {"bits": bits}, keygen_repeat, 0)
+        key_pair = rsa.generate_rsa_keys(bits)
+        message = "benchmark message"
+        signature = rsa.sign_message(message, key_pair)
+        suite.run("rsa.sign", lambda: rsa.sign_message(message, key_pair), {"bits": bits})
+        suite.run("rsa.verify", lambda: rsa.verify_signature(message, signature, key_pair), {"bits": bits})
+
+def bench_rabin(suite: Suite, key_bits: list[int], keygen_repeat: int) -> None:
+    for bits in key_bits:
+        suite.run("rabin.generate_keys", lambda: rabin.generate_keys(bits),
+                  {"bits": bits}, keygen_repeat, 0)
+        private_key, public_key = rabin.generate_keys(bits)
+        message = random.getrandbits(64)
+        ciphertext = rabin.encrypt(message, public_key)
+        suite.run("rabin.encrypt", lambda: rabin.encrypt(message, public_key), {"bits": bits})
+        suite.run("rabin.decrypt", lambda: rabin.decrypt(ciphertext, private_key), {"bits": bits})
+
+def bench_pipeline(suite: Suite, sizes: list[int]) -> None:
+    rabin_private, rabin_public = rabin.generate_keys(512)
+    key_pair = rsa.generate_rsa_keys(1024)
+    for size in sizes:
+        plaintext = "x" * size
+        encrypted = main.encrypt(plaintext, rabin_public, key_pair)
+        repeat = suite.repeat if size <= 1 << 20 else 1
+        warmup = suite.warmup if size <= 1 << 20 else 0
+        suite.run("main.encrypt", lambda: main.encrypt(plaintext, rabin_public, key_pair),
+                  {"size": size}, repeat, warmup, nbytes=size)
+        suite.run("main.decrypt", lambda: main.decrypt(encrypted, rabin_private, key_pair),
+                  {"size": size}, repeat, warmup, nbytes=size)
+
+def metadata() -> dict[str, Any]:
+    """Сведения об окружении для сравнения результатов между коммитами"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+
+def compare(baseline_path: str, current_path: str) -> None:
+    """Печатает изменение медианы для замеров, присутствующих в обоих файлах"""
+    def load(path: str) -> dict[str, float]:
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+        return {
+            f"{r['name']} {json.dumps(r['params'], sort_keys=True)}": r["stats"]["p50"]
+            for r in report["results"]
+        }
+
+    baseline, current = load(baseline_path), load(current_path)
+    for key in sorted(baseline.keys() & current.keys()):
+        ratio = current[key] / baseline[key]
+        print(f"{key}: {baseline[key] * 1e3:.3f} -> {current[key] * 1e3:.3f} мс ({ratio:.2f}x)")
+
+def main_cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарки DES-X, RSA, Рабина и гибридной схемы")
+    parser.add_argument("--repeat", type=int, default=10, help="число замеряемых запусков")
+    parser.add_argument("--warmup", type=int, default=2, help="число прогревочных запусков")
+    parser.add_argument("--keygen-repeat", type=int, default=3, help="число запусков генерации ключей")
+    parser.add_argument("--full", action="store_true", help="включить размеры до 100 МБ")
+    parser.add_argument("--bits", type=int, nargs="+", default=DEFAULT_KEY_BITS, help="размеры ключей")
+    parser.add_argument("--only", nargs="+", choices=["des", "desx", "rsa", "rabin", "pipeline"],
+                        help="запустить только указанные группы")
+    parser.add_argument("--output", help="файл для результатов в формате JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="сравнить два JSON-отчёта и выйти")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sizes = FULL_SIZES if args.full else DEFAULT_SIZES
+    groups = set(args.only or ["des", "desx", "rsa", "rabin", "pipeline"])
+    suite = Suite(args.repeat, args.warmup)
+
+    if "des" in groups:
+        bench_des(suite)
+    if "desx" in groups:
+        bench_desx(suite, sizes)
+    if "rsa" in groups:
+        bench_rsa(suite, args.bits, args.keygen_repeat)
+    if "rabin" in groups:
+        bench_rabin(suite, args.bits, args.keygen_repeat)
+    if "pipeline" in groups:
+        bench_pipeline(suite, sizes)
+
+    report = {"meta": metadata(), "results": suite.results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main_cli()
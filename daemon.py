@@ -0,0 +1,335 @@
+import argparse
+import asyncio
+import os
+import struct
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Sequence
+
+import main
+import metrics
+from keystore import load_or_generate
+from rsa import RSASignature, sign_message, verify_signature
+
+# По умолчанию — Unix-сокет с правами 0600: служба подписывает и дешифрует
+# без аутентификации, поэтому доступ к ней должен быть только у владельца
+DEFAULT_ADDRESS = "unix:" + os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"desx-daemon-{os.getuid()}.sock"
+)
+SOCKET_MODE = 0o600
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+DEFAULT_KEYSTORE = "keystore.bin"
+
+# Кадр: 4 байта длины и тело. Тело запроса: номер запроса, операция и число
+# элементов, затем элементы с 4-байтовым префиксом длины. Тело ответа: номер
+# запроса, статус кадра и число элементов, каждый с флагом успеха и длиной.
+FRAME = struct.Struct('>I')
+HEADER = struct.Struct('>IBI')
+ITEM = struct.Struct('>I')
+RESULT_ITEM = struct.Struct('>BI')
+SIGNATURE_LENGTH = struct.Struct('>H')
+MAX_FRAME_SIZE = 64 << 20
+
+OP_ENCRYPT = 1
+OP_DECRYPT = 2
+OP_SIGN = 3
+OP_VERIFY = 4
+OP_NAMES = {OP_ENCRYPT: "encrypt", OP_DECRYPT: "decrypt", OP_SIGN: "sign", OP_VERIFY: "verify"}
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+Outcome = tuple[bool, bytes]
+
+def parse_address(address: str) -> tuple[str, Any]:
+    """
+    Разбирает адрес службы: "unix:/путь/к/сокету" или "хост:порт".
+    Возвращает ("unix", путь) или ("tcp", (хост, порт)).
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Неверный адрес службы: {address}")
+    return "tcp", (host, int(port))
+
+def _encode_items(header: bytes, items: Sequence[bytes]) -> bytes:
+    parts = [b'', header]
+    for item in items:
+        parts.append(ITEM.pack(len(item)))
+        parts.append(item)
+    body_size = sum(map(len, parts))
+    parts[0] = FRAME.pack(body_size)
+    return b''.join(parts)
+
+def encode_request(request_id: int, op: int, items: Sequence[bytes]) -> bytes:
+    """Кадр запроса с пакетом элементов для одной операции"""
+    return _encode_items(HEADER.pack(request_id, op, len(items)), items)
+
+def decode_request(body: bytes) -> tuple[int, int, list[bytes]]:
+    if len(body) < HEADER.size:
+        raise ValueError("Кадр обрезан: заголовок неполон")
+    request_id, op, count = HEADER.unpack_from(body)
+    offset = HEADER.size
+    items = []
+    for _ in range(count):
+        if len(body) < offset + ITEM.size:
+            raise ValueError("Кадр обрезан: заголовок неполон")
+        (length,) = ITEM.unpack_from(body, offset)
+        offset += ITEM.size
+        items.append(body[offset:offset + length])
+        offset += length
+    if offset != len(body):
+        raise ValueError("Размер кадра не совпадает с заголовком")
+    return request_id, op, items
+
+def encode_response(request_id: int, status: int, outcomes: Sequence[Outcome]) -> bytes:
+    """Кадр ответа: для каждого элемента флаг успеха и результат или текст ошибки"""
+    parts = [b'', HEADER.pack(request_id, status, len(outcomes))]
+    for ok, data in outcomes:
+        parts.append(RESULT_ITEM.pack(ok, len(data)))
+        parts.append(data)
+    parts[0] = FRAME.pack(sum(map(len, parts)))
+    return b''.join(parts)
+
+def decode_response(body: bytes) -> tuple[int, int, list[Outcome]]:
+    if len(body) < HEADER.size:
+        raise ValueError("Кадр обрезан: заголовок неполон")
+    request_id, status, count = HEADER.unpack_from(body)
+    offset = HEADER.size
+    outcomes = []
+    for _ in range(count):
+        ok, length = RESULT_ITEM.unpack_from(body, offset)
+        offset += RESULT_ITEM.size
+        outcomes.append((bool(ok), body[offset:offset + length]))
+        offset += length
+    return request_id, status, outcomes
+
+def encode_verify_item(message: bytes, signature: RSASignature) -> bytes:
+    """Элемент запроса проверки: подпись с 2-байтовым префиксом длины, затем сообщение"""
+    data = signature.signature.to_bytes((signature.signature.bit_length() + 7) // 8 or 1, 'big')
+    return SIGNATURE_LENGTH.pack(len(data)) + data + message
+
+def _decode_verify_item(item: bytes) -> tuple[bytes, RSASignature]:
+    (length,) = SIGNATURE_LENGTH.unpack_from(item)
+    start = SIGNATURE_LENGTH.size
+    return item[start + length:], RSASignature(int.from_bytes(item[start:start + length], 'big'))
+
+# Ключи, загруженные в рабочем процессе инициализатором пула
+_worker_keys: tuple = ()
+
+def _init_worker(keystore_path: str) -> None:
+    global _worker_keys
+    _worker_keys = load_or_generate(keystore_path)
+
+def _attempt(func: Callable[[bytes], Any], item: bytes) -> Any:
+    try:
+        return func(item)
+    except Exception as e:
+        return e
+
+def _outcomes(results: Sequence[Any], encode: Callable[[Any], bytes]) -> list[Outcome]:
+    return [
+        (False, str(result).encode()) if isinstance(result, Exception) else (True, encode(result))
+        for result in results
+    ]
+
+def handle_batch(op: int, items: list[bytes]) -> list[Outcome]:
+    """
+    Выполняет пакет в рабочем процессе ключами из хранилища.
+    Ошибка отдельного элемента возвращается на его позиции.
+    """
+    rabin_private_key, rsa_key_pair = _worker_keys
+    if op == OP_ENCRYPT:
+        plaintexts = [_attempt(bytes.decode, item) for item in items]
+        valid = [p for p in plaintexts if not isinstance(p, Exception)]
+        encrypted = iter(main.encrypt_batch(valid, rabin_private_key.n, rsa_key_pair))
+        results = [p if isinstance(p, Exception) else next(encrypted) for p in plaintexts]
+        return _outcomes(results, lambda result: result.to_bytes(rabin_private_key.n, rsa_key_pair))
+    if op == OP_DECRYPT:
+        parsed = [_attempt(main.EncryptionResult.from_bytes, item) for item in items]
+        valid = [r for r in parsed if not isinstance(r, Exception)]
+        decrypted = iter(main.decrypt_batch(valid, rabin_private_key, rsa_key_pair))
+        results = [r if isinstance(r, Exception) else next(decrypted) for r in parsed]
+        return _outcomes(results, str.encode)
+    if op == OP_SIGN:
+        results = [_attempt(lambda item: sign_message(item, rsa_key_pair), item) for item in items]
+        return _outcomes(results, lambda s: s.signature.to_bytes((s.signature.bit_length() + 7) // 8 or 1, 'big'))
+    if op == OP_VERIFY:
+        results = [
+            _attempt(lambda item: verify_signature(*_decode_verify_item(item), rsa_key_pair), item)
+            for item in items
+        ]
+        return _outcomes(results, lambda valid: b'\x01' if valid else b'\x00')
+    raise ValueError(f"Неизвестная операция: {op}")
+
+class CryptoDaemon:
+    """
+    Локальная служба шифрования. Ключи загружаются из хранилища один раз
+    в каждом процессе постоянного пула, так что ключи, кэш проверенных
+    сеансовых ключей и расписания DES остаются прогретыми между запросами.
+    Запросы одного соединения обрабатываются конвейерно: ответы
+    отправляются по мере готовности и сопоставляются по номеру запроса.
+    """
+
+    def __init__(
+        self,
+        address: str = DEFAULT_ADDRESS,
+        keystore_path: str = DEFAULT_KEYSTORE,
+        workers: int | None = None,
+        max_in_flight: int = 64
+    ):
+        self.address = address
+        self.keystore_path = keystore_path
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight  # Число необработанных кадров на соединение
+        self.pool: ProcessPoolExecutor | None = None
+
+    async def serve_forever(self) -> None:
+        # Ключи создаются до запуска пула, чтобы процессы не генерировали их одновременно
+        load_or_generate(self.keystore_path)
+        kind, target = parse_address(self.address)
+        # TCP без аутентификации допускается только на локальном интерфейсе
+        if kind == "tcp" and target[0] not in LOOPBACK_HOSTS:
+            raise ValueError(f"Служба может слушать TCP только на локальном интерфейсе: {target[0]}")
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self.keystore_path,)
+        )
+        try:
+            # Все процессы запускаются и загружают ключи до первого запроса
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self.pool, os.getpid) for _ in range(self.workers)))
+
+            if kind == "unix":
+                if os.path.exists(target):
+                    os.unlink(target)
+                # umask закрывает сокет уже при создании, chmod явно закрепляет права
+                previous_umask = os.umask(0o177)
+                try:
+                    server = await asyncio.start_unix_server(self._serve_connection, path=target)
+                finally:
+                    os.umask(previous_umask)
+                os.chmod(target, SOCKET_MODE)
+            else:
+                server = await asyncio.start_server(self._serve_connection, *target)
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            if kind == "unix" and os.path.exists(target):
+                os.unlink(target)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # Чтение кадров не ждёт свободного слота: клиент может отправить весь
+        # конвейер до чтения ответов, и остановка чтения заблокировала бы обе стороны.
+        # Слоты ограничивают только число кадров, выполняемых в пуле.
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks: set[asyncio.Task] = set()
+        try:
+            while True:
+                try:
+                    (length,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+                    if length > MAX_FRAME_SIZE:
+                        break
+                    body = await reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                task = asyncio.create_task(self._dispatch(body, writer, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def _dispatch(self, body: bytes, writer: asyncio.StreamWriter, slots: asyncio.Semaphore) -> None:
+        request_id = 0
+        try:
+            request_id, op, items = decode_request(body)
+            async with slots:
+                with metrics.timed("daemon.request", {"op": OP_NAMES.get(op, "unknown")}):
+                    outcomes = await asyncio.get_running_loop().run_in_executor(
+                        self.pool, handle_batch, op, items
+                    )
+            metrics.increment("daemon.items", len(items), {"op": OP_NAMES.get(op, "unknown")})
+            response = encode_response(request_id, STATUS_OK, outcomes)
+        except Exception as e:
+            response = encode_response(request_id, STATUS_ERROR, [(False, str(e).encode())])
+        # Кадр передаётся транспорту одним вызовом write, поэтому ответы не
+        # перемешиваются без блокировки, а ожидание drain не задерживает другие ответы
+        writer.write(response)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+def self_test(frames: int = 40, max_in_flight: int = 4, timeout: float = 60.0) -> bool:
+    """
+    Проверяет, что конвейер длиннее max_in_flight не блокирует соединение:
+    клиент отправляет все кадры до чтения ответов, как DaemonClient.call_many.
+    Служба запускается в отдельном потоке на временном Unix-сокете.
+    Возвращает True, если на все кадры получены ответы до timeout.
+    """
+    # daemon_client импортирует этот модуль
+    from daemon_client import DaemonClient
+
+    with tempfile.TemporaryDirectory() as directory:
+        address = "unix:" + os.path.join(directory, "daemon.sock")
+        daemon = CryptoDaemon(address, os.path.join(directory, "keystore.bin"), 1, max_in_flight)
+        loop = asyncio.new_event_loop()
+        serving = loop.create_task(daemon.serve_forever())
+
+        def run() -> None:
+            try:
+                loop.run_until_complete(serving)
+            except asyncio.CancelledError:
+                pass
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            socket_path = parse_address(address)[1]
+            while not os.path.exists(socket_path):
+                if not thread.is_alive():
+                    return False
+                thread.join(0.05)
+            # Запросы и ответы вместе больше буферов сокета: без чтения кадров
+            # во время обработки клиент застрял бы в sendall, а служба в drain
+            requests = [(OP_SIGN, [b'x' * 2000] * 300)] * frames
+            with DaemonClient(address, pool_size=1, timeout=timeout) as client:
+                responses = client.call_many(requests)
+            return all(
+                len(response) == len(items) and not any(isinstance(r, Exception) for r in response)
+                for response, (_, items) in zip(responses, requests)
+            )
+        except OSError:
+            return False
+        finally:
+            loop.call_soon_threadsafe(serving.cancel)
+            thread.join()
+            loop.close()
+
+def main_cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Локальная служба гибридного шифрования")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS,
+                        help='"unix:/путь" (по умолчанию) или локальный "хост:порт"')
+    parser.add_argument("--keystore", default=DEFAULT_KEYSTORE, help="файл хранилища ключей")
+    parser.add_argument("--workers", type=int, help="число рабочих процессов")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="кадров в работе на соединение")
+    parser.add_argument("--self-test", action="store_true", help="проверить конвейерную обработку и выйти")
+    args = parser.parse_args(argv)
+
+    if args.self_test:
+        ok = self_test()
+        print("Самопроверка пройдена" if ok else "Самопроверка не пройдена")
+        raise SystemExit(0 if ok else 1)
+
+    daemon = CryptoDaemon(args.address, args.keystore, args.workers, args.max_in_flight)
+    try:
+        asyncio.run(daemon.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,141 @@
+import itertools
+import queue
+import socket
+from typing import Sequence
+
+from daemon import (
+    DEFAULT_ADDRESS,
+    FRAME,
+    OP_DECRYPT,
+    OP_ENCRYPT,
+    OP_SIGN,
+    OP_VERIFY,
+    STATUS_OK,
+    decode_response,
+    encode_request,
+    encode_verify_item,
+    parse_address
+)
+from main import EncryptionResult
+from rsa import RSASignature
+
+class _Connection:
+    """Соединение со службой, которое держится открытым между запросами"""
+
+    def __init__(self, address: str, timeout: float | None):
+        kind, target = parse_address(address)
+        family = socket.AF_UNIX if kind == "unix" else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(target)
+        if kind == "tcp":
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def send(self, data: bytes) -> None:
+        self.sock.sendall(data)
+
+    def receive(self) -> bytes:
+        """Читает тело очередного кадра ответа"""
+        header = self.reader.read(FRAME.size)
+        if len(header) != FRAME.size:
+            raise ConnectionError("Служба закрыла соединение")
+        (length,) = FRAME.unpack(header)
+        body = self.reader.read(length)
+        if len(body) != length:
+            raise ConnectionError("Служба закрыла соединение")
+        return body
+
+    def close(self) -> None:
+        self.reader.close()
+        self.sock.close()
+
+class DaemonClient:
+    """
+    Клиент локальной службы шифрования с пулом постоянных соединений.
+    Потокобезопасен: каждый вызов берёт из пула свободное соединение.
+    Ошибка отдельного элемента возвращается на его позиции как ValueError.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, pool_size: int = 4, timeout: float | None = 30.0):
+        self.address = address
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[_Connection] = queue.LifoQueue()
+        self._ids = itertools.count(1)
+
+    def _acquire(self) -> _Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return _Connection(self.address, self.timeout)
+
+    def _release(self, connection: _Connection) -> None:
+        if self._idle.qsize() < self.pool_size:
+            self._idle.put(connection)
+        else:
+            connection.close()
+
+    def call_many(self, requests: Sequence[tuple[int, Sequence[bytes]]]) -> list[list[bytes | Exception]]:
+        """
+        Конвейерно отправляет несколько пакетов по одному соединению и только
+        затем читает ответы. Возвращает результаты в порядке requests.
+        """
+        ids = [next(self._ids) for _ in requests]
+        connection = self._acquire()
+        try:
+            connection.send(b''.join(
+                encode_request(request_id, op, items) for request_id, (op, items) in zip(ids, requests)
+            ))
+            responses = {}
+            while len(responses) < len(ids):
+                request_id, status, outcomes = decode_response(connection.receive())
+                responses[request_id] = (status, outcomes)
+        except BaseException:
+            connection.close()
+            raise
+        self._release(connection)
+
+        results = []
+        for request_id in ids:
+            status, outcomes = responses[request_id]
+            if status != STATUS_OK:
+                raise ValueError(outcomes[0][1].decode() if outcomes else "Ошибка службы")
+            results.append([data if ok else ValueError(data.decode()) for ok, data in outcomes])
+        return results
+
+    def call(self, op: int, items: Sequence[bytes]) -> list[bytes | Exception]:
+        return self.call_many([(op, items)])[0]
+
+    def encrypt(self, plaintexts: Sequence[str]) -> list[EncryptionResult | Exception]:
+        results = self.call(OP_ENCRYPT, [plaintext.encode() for plaintext in plaintexts])
+        return [r if isinstance(r, Exception) else EncryptionResult.from_bytes(r) for r in results]
+
+    def decrypt(self, encryption_results: Sequence[EncryptionResult]) -> list[str | Exception]:
+        results = self.call(OP_DECRYPT, [result.to_bytes() for result in encryption_results])
+        return [r if isinstance(r, Exception) else r.decode() for r in results]
+
+    def sign(self, messages: Sequence[str | bytes]) -> list[RSASignature | Exception]:
+        results = self.call(OP_SIGN, [m.encode() if isinstance(m, str) else m for m in messages])
+        return [r if isinstance(r, Exception) else RSASignature(int.from_bytes(r, 'big')) for r in results]
+
+    def verify(self, messages: Sequence[str | bytes], signatures: Sequence[RSASignature]) -> list[bool | Exception]:
+        items = [
+            encode_verify_item(m.encode() if isinstance(m, str) else m, signature)
+            for m, signature in zip(messages, signatures)
+        ]
+        return [r if isinstance(r, Exception) else r == b'\x01' for r in self.call(OP_VERIFY, items)]
+
+    def close(self) -> None:
+        """Закрывает все соединения пула"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
@@ -1,5 +1,37 @@
+import hashlib
+import hmac
+import itertools
+import mmap
+import os
 import random
-from typing import Self
+import secrets
+import struct
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Self
+
+import metrics
+from cache import LRUCache
+
+STREAM_CHUNK_SIZE = 1 << 16  # Размер буфера потокового режима
+BLOCK = struct.Struct('>Q')  # 64-битный блок в порядке big-endian
+# Шифротекст CTR в CryptoManager начинается со случайного 64-битного нонса,
+# который служит начальным значением счётчика для этого сообщения
+NONCE_SIZE = BLOCK.size
+
+# Буфер с поддержкой протокола буферов: bytes, bytearray, memoryview, mmap
+Buffer = bytes | bytearray | memoryview | mmap.mmap
+
+# Общий кэш развёрнутых расписаний раундовых ключей по DES-ключу
+KEY_SCHEDULE_CACHE = LRUCache(maxsize=256)
+
+def configure_key_schedule_cache(maxsize: int = 256, ttl: float | None = None) -> LRUCache:
+    """Задаёт размер и время жизни общего кэша расписаний ключей"""
+    KEY_SCHEDULE_CACHE.clear()
+    KEY_SCHEDULE_CACHE.maxsize = maxsize
+    KEY_SCHEDULE_CACHE.ttl = ttl
+    return KEY_SCHEDULE_CACHE
 
 class DESCryptor:
     """Класс для выполнения шифрования/дешифрования по алгоритму DES"""
@@ -102,11 +134,56 @@ class DESCryptor:
     
     ROUND_SHIFTS = [1,1,2,2,2,2,2,2,1,2,2,2,2,2,2,1]
 
-    def __init__(self, key: int):
+    # Таблицы быстрого движка, строятся один раз в _build_tables()
+    SP_TABLES: list[list[int]] = []
+    IP_BYTE_TABLES: list[list[int]] = []
+    FP_BYTE_TABLES: list[list[int]] = []
+
+    def __init__(self, key: int, cache: LRUCache | None = KEY_SCHEDULE_CACHE):
         self.key = key
-        self.round_keys = self._generate_round_keys()
+        schedule = cache.get(key) if cache is not None else None
+        if schedule is None:
+            round_keys = self._generate_round_keys()
+            encrypt_subkeys = self._split_round_keys(round_keys)
+            schedule = (round_keys, encrypt_subkeys, encrypt_subkeys[::-1])
+            if cache is not None:
+                cache.put(key, schedule)
+        self.round_keys, self._encrypt_subkeys, self._decrypt_subkeys = schedule
+
+    @classmethod
+    def _build_tables(cls) -> None:
+        """Строит таблицы S-бокс+P-бокс и побайтовые таблицы IP/FP"""
+        cls.SP_TABLES = []
+        for s_box_num in range(8):
+            table = []
+            for bits in range(64):
+                row = ((bits >> 5) << 1) | (bits & 0x1)
+                col = (bits >> 1) & 0xF
+                s_value = cls.S_BOXES[s_box_num][row][col]
+                table.append(cls._permute(s_value << (28 - 4 * s_box_num), cls.P_BOX, 32))
+            cls.SP_TABLES.append(table)
+
+        cls.IP_BYTE_TABLES = cls._byte_tables(cls.INITIAL_PERMUTATION_TABLE)
+        cls.FP_BYTE_TABLES = cls._byte_tables(cls.FINAL_PERMUTATION_TABLE)
+
+    @classmethod
+    def _byte_tables(cls, table: list[int]) -> list[list[int]]:
+        """Для каждого байта блока строит таблицу образов всех 256 значений"""
+        return [
+            [cls._permute(value << (56 - 8 * byte_num), table, 64) for value in range(256)]
+            for byte_num in range(8)
+        ]
+
+    @staticmethod
+    def _split_round_keys(round_keys: list[int]) -> list[tuple[int, ...]]:
+        """Разбивает 48-битные раундовые ключи на 6-битные части для S-боксов"""
+        return [
+            tuple((key >> (42 - 6 * s_box_num)) & 0x3F for s_box_num in range(8))
+            for key in round_keys
+        ]
 
-    def _permute(self, block: int, table: list[int], bits: int) -> int:
+    @staticmethod
+    def _permute(block: int, table: list[int], bits: int) -> int:
         """Выполняет перестановку битов согласно таблице"""
         result = 0
         for pos in table:
@@ -162,7 +239,45 @@ class DESCryptor:
         return round_keys
 
     def process_block(self, block: int, encrypt: bool = True) -> int:
-        """Обрабатывает один блок данных (64 бита)"""
+        """Обрабатывает один блок данных (64 бита) с помощью таблиц"""
+        ip = self.IP_BYTE_TABLES
+        block = (
+            ip[0][block >> 56] | ip[1][(block >> 48) & 0xFF] |
+            ip[2][(block >> 40) & 0xFF] | ip[3][(block >> 32) & 0xFF] |
+            ip[4][(block >> 24) & 0xFF] | ip[5][(block >> 16) & 0xFF] |
+            ip[6][(block >> 8) & 0xFF] | ip[7][block & 0xFF]
+        )
+
+        left, right = block >> 32, block & 0xFFFFFFFF
+        sp0, sp1, sp2, sp3, sp4, sp5, sp6, sp7 = self.SP_TABLES
+        subkeys = self._encrypt_subkeys if encrypt else self._decrypt_subkeys
+
+        for k0, k1, k2, k3, k4, k5, k6, k7 in subkeys:
+            # Расширение E выполняется сдвигами: каждый S-бокс получает 6 бит,
+            # перекрывающихся с соседями, с циклическим переносом по краям
+            new_right = left ^ (
+                sp0[(((right & 0x1) << 5) | (right >> 27)) ^ k0] |
+                sp1[((right >> 23) & 0x3F) ^ k1] |
+                sp2[((right >> 19) & 0x3F) ^ k2] |
+                sp3[((right >> 15) & 0x3F) ^ k3] |
+                sp4[((right >> 11) & 0x3F) ^ k4] |
+                sp5[((right >> 7) & 0x3F) ^ k5] |
+                sp6[((right >> 3) & 0x3F) ^ k6] |
+                sp7[(((right & 0x1F) << 1) | (right >> 31)) ^ k7]
+            )
+            left, right = right, new_right
+
+        combined = (right << 32) | left
+        fp = self.FP_BYTE_TABLES
+        return (
+            fp[0][combined >> 56] | fp[1][(combined >> 48) & 0xFF] |
+            fp[2][(combined >> 40) & 0xFF] | fp[3][(combined >> 32) & 0xFF] |
+            fp[4][(combined >> 24) & 0xFF] | fp[5][(combined >> 16) & 0xFF] |
+            fp[6][(combined >> 8) & 0xFF] | fp[7][combined & 0xFF]
+        )
+
+    def process_block_reference(self, block: int, encrypt: bool = True) -> int:
+        """Эталонная побитовая реализация, используется для проверки быстрого движка"""
         block = self._permute(block, self.INITIAL_PERMUTATION_TABLE, 64)
         
         left, right = (block >> 32) & 0xFFFFFFFF, block & 0xFFFFFFFF
@@ -179,14 +294,53 @@ class DESCryptor:
         combined = (right << 32) | left
         return self._permute(combined, self.FINAL_PERMUTATION_TABLE, 64)
 
+DESCryptor._build_tables()
+
+def self_test(samples: int = 256) -> bool:
+    """
+    Сверяет табличный движок DES с эталонной реализацией бит в бит.
+    Параметры:
+        samples: Количество случайных пар (ключ, блок) для проверки.
+    Возвращает:
+        True, если результаты совпали во всех случаях.
+    """
+    for _ in range(samples):
+        cryptor = DESCryptor(random.getrandbits(64))
+        block = random.getrandbits(64)
+        for encrypt in (True, False):
+            if cryptor.process_block(block, encrypt) != cryptor.process_block_reference(block, encrypt):
+                return False
+    return True
+
 class DESXCipher:
-    """Реализация DES-X с CBC режимом"""
+    """
+    Реализация DES-X с режимами CBC (по умолчанию), CTR и ECB.
+    В режиме CTR iv служит начальным значением счётчика и не должен
+    повторяться для одного ключа; CryptoManager выбирает его случайно
+    для каждого сообщения.
+    """
+
+    MODES = ("cbc", "ctr", "ecb")
     
-    def __init__(self, des_key: int, k1: int, k2: int, iv: int):
-        self.cryptor = DESCryptor(des_key)
+    def __init__(
+        self,
+        des_key: int,
+        k1: int,
+        k2: int,
+        iv: int,
+        cryptor: DESCryptor | None = None,
+        mode: str = "cbc"
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"Неизвестный режим: {mode}")
+        # Готовый DESCryptor позволяет не разворачивать раундовые ключи заново
+        if cryptor is None or cryptor.key != des_key:
+            cryptor = DESCryptor(des_key)
+        self.cryptor = cryptor
         self.k1 = k1
         self.k2 = k2
         self.iv = iv
+        self.mode = mode
         self.prev_block = iv
 
     def _process_chunk(self, chunk: bytes) -> bytes:
@@ -197,53 +351,416 @@ class DESXCipher:
 
     def encrypt(self, data: bytes) -> bytes:
         """Шифрует данные"""
-        result = bytearray()
-        for i in range(0, len(data), 8):
-            chunk = self._process_chunk(data[i:i+8])
-            block = int.from_bytes(chunk, 'big')
-            
-            block ^= self.prev_block
-            block ^= self.k1
-            encrypted = self.cryptor.process_block(block)
-            encrypted ^= self.k2
-            
-            self.prev_block = encrypted
-            result.extend(encrypted.to_bytes(8, 'big'))
-        
+        if self.mode == "ctr":
+            return self.ctr_crypt(data)
+        result = bytearray(len(data) + (-len(data) % 8))
+        self.encrypt_into(data, result)
         return bytes(result)
 
     def decrypt(self, data: bytes) -> bytes:
         """Дешифрует данные"""
-        result = bytearray()
+        if self.mode == "ctr":
+            return self.ctr_crypt(data)
+        result = bytearray(len(data))
+        length = self.decrypt_into(data, result)
+        return bytes(memoryview(result)[:length])
+
+    def encrypt_into(self, src: Buffer, dst: Buffer) -> int:
+        """
+        Шифрует буфер src в записываемый буфер dst (допустимо src is dst).
+        Блоки читаются и пишутся через struct без создания срезов;
+        для CBC и ECB dst должен вмещать src, дополненный нулями до кратности 8.
+        Возвращает количество записанных байт.
+        """
+        length = len(src)  # type:ignore
+        if self.mode == "ctr":
+            self._ctr_into(src, dst, length)
+            return length
+
+        process_block = self.cryptor.process_block
+        k1, k2 = self.k1, self.k2
+        cbc = self.mode == "cbc"
+        prev = self.prev_block
+        full = length - length % 8
+        for offset in range(0, full, 8):
+            (block,) = BLOCK.unpack_from(src, offset)
+            if cbc:
+                block ^= prev
+            prev = process_block(block ^ k1) ^ k2
+            BLOCK.pack_into(dst, offset, prev)
+        if full < length:
+            # Последний неполный блок дополняется нулями
+            block = int.from_bytes(self._process_chunk(bytes(src[full:length])), 'big')  # type:ignore
+            if cbc:
+                block ^= prev
+            prev = process_block(block ^ k1) ^ k2
+            BLOCK.pack_into(dst, full, prev)
+            full += 8
+        if cbc:
+            self.prev_block = prev
+        return full
+
+    def decrypt_into(self, src: Buffer, dst: Buffer) -> int:
+        """
+        Дешифрует буфер src в записываемый буфер dst (допустимо src is dst).
+        Возвращает длину открытого текста: для CBC и ECB без хвостовых нулевых
+        байт дополнения, которые ищутся только с конца буфера.
+        """
+        length = len(src)  # type:ignore
+        if self.mode == "ctr":
+            self._ctr_into(src, dst, length)
+            return length
+        self._decrypt_into(src, dst, self.iv)
+        end = length
+        while end and dst[end - 1] == 0:  # type:ignore
+            end -= 1
+        return end
+
+    def _decrypt_into(self, src: Buffer, dst: Buffer, prev_cipher_block: int) -> None:
+        """Дешифрует блоки CBC (или ECB), начиная с заданного значения сцепления"""
+        length = len(src)  # type:ignore
+        if length % 8:
+            raise ValueError("Длина шифротекста должна быть кратна 8 байтам")
+        process_block = self.cryptor.process_block
+        k1, k2 = self.k1, self.k2
+        cbc = self.mode == "cbc"
+        for offset in range(0, length, 8):
+            (encrypted,) = BLOCK.unpack_from(src, offset)
+            decrypted = process_block(encrypted ^ k2, False) ^ k1
+            if cbc:
+                decrypted ^= prev_cipher_block
+                prev_cipher_block = encrypted
+            BLOCK.pack_into(dst, offset, decrypted)
+
+    def _ctr_into(self, src: Buffer, dst: Buffer, length: int, position: int = 0) -> None:
+        """
+        Режим CTR поверх буферов: XOR с ключевым потоком по 8 байт.
+        position — смещение src от начала шифротекста, кратное 8.
+        """
+        full = length - length % 8
+        index = position // 8
+        for offset in range(0, full, 8):
+            (block,) = BLOCK.unpack_from(src, offset)
+            BLOCK.pack_into(dst, offset, block ^ self.keystream_block(index))
+            index += 1
+        if full < length:
+            dst[full:length] = self.ctr_crypt(bytes(src[full:length]), position + full)  # type:ignore
+
+    def encrypt_authenticated(self, data: Buffer, associated_data: bytes = b'') -> tuple[bytes, bytes]:
+        """
+        Шифрует данные и за тот же проход вычисляет тег — SHA-256
+        associated_data (например, нонса CTR) и шифротекста.
+        Буфер обрабатывается сегментами по STREAM_CHUNK_SIZE, и каждый сегмент
+        хэшируется сразу после шифрования, пока он ещё в кэше.
+        Для CBC и ECB используется дополнение PKCS#7, поэтому длина открытого
+        текста при дешифровании определяется по последнему байту.
+        Возвращает (шифротекст, тег).
+        """
+        length = len(data)  # type:ignore
+        ctr = self.mode == "ctr"
+        if ctr:
+            result = bytearray(data)
+        else:
+            pad = 8 - length % 8
+            result = bytearray(length + pad)
+            result[:length] = data
+            result[length:] = bytes((pad,)) * pad
+        view = memoryview(result)
+        hasher = hashlib.sha256(associated_data)
+        for start in range(0, len(result), STREAM_CHUNK_SIZE):
+            segment = view[start:start + STREAM_CHUNK_SIZE]
+            if ctr:
+                self._ctr_into(segment, segment, len(segment), start)
+            else:
+                self.encrypt_into(segment, segment)
+            hasher.update(segment)
+        return bytes(result), hasher.digest()
+
+    def decrypt_authenticated(self, data: Buffer, tag: bytes, associated_data: bytes = b'') -> bytes:
+        """
+        Дешифрует данные encrypt_authenticated, хэшируя каждый сегмент
+        шифротекста в том же проходе. Открытый текст возвращается только
+        при совпадении тега; дополнение PKCS#7 снимается по последнему байту.
+        """
+        length = len(data)  # type:ignore
+        ctr = self.mode == "ctr"
+        if not ctr and (length % 8 or not length):
+            raise ValueError("Длина шифротекста должна быть кратна 8 байтам")
+        src = memoryview(data)  # type:ignore
+        result = bytearray(length)
+        dst = memoryview(result)
+        hasher = hashlib.sha256(associated_data)
         prev_cipher_block = self.iv
-        
-        for i in range(0, len(data), 8):
-            chunk = data[i:i+8]
-            encrypted = int.from_bytes(chunk, 'big')
-            
-            decrypted = encrypted ^ self.k2
-            decrypted = self.cryptor.process_block(decrypted, encrypt=False)
-            decrypted ^= self.k1
-            decrypted ^= prev_cipher_block
-            
-            prev_cipher_block = encrypted
-            result.extend(decrypted.to_bytes(8, 'big'))
-        
-        return bytes(result).rstrip(b'\x00')
+        for start in range(0, length, STREAM_CHUNK_SIZE):
+            segment = src[start:start + STREAM_CHUNK_SIZE]
+            hasher.update(segment)
+            if ctr:
+                self._ctr_into(segment, dst[start:start + len(segment)], len(segment), start)
+            else:
+                self._decrypt_into(segment, dst[start:start + len(segment)], prev_cipher_block)
+                (prev_cipher_block,) = BLOCK.unpack_from(segment, len(segment) - 8)
+        if not hmac.compare_digest(hasher.digest(), tag):
+            raise ValueError("Тег целостности не совпадает")
+        if ctr:
+            return bytes(result)
+
+        pad = result[-1]
+        if not 1 <= pad <= 8 or result[-pad:] != bytes((pad,)) * pad:
+            raise ValueError("Неверное дополнение")
+        return bytes(dst[:length - pad])
+
+    def keystream_block(self, index: int) -> int:
+        """Блок ключевого потока CTR с номером index"""
+        counter = (self.iv + index) & 0xFFFFFFFFFFFFFFFF
+        return self.cryptor.process_block(counter ^ self.k1) ^ self.k2
+
+    def ctr_crypt(self, data: bytes, offset: int = 0) -> bytes:
+        """
+        Шифрует или дешифрует данные в режиме CTR.
+        offset — позиция data в байтах от начала шифротекста, что позволяет
+        обработать произвольный диапазон без обработки предшествующих данных.
+        Дополнение не используется: длина результата равна длине data.
+        """
+        result = bytearray(len(data))
+        index, skip = divmod(offset, 8)
+        position = 0
+        while position < len(data):
+            keystream = self.keystream_block(index).to_bytes(8, 'big')[skip:]
+            chunk = data[position:position + len(keystream)]
+            value = int.from_bytes(chunk, 'big') ^ int.from_bytes(keystream[:len(chunk)], 'big')
+            result[position:position + len(chunk)] = value.to_bytes(len(chunk), 'big')
+            position += len(chunk)
+            index += 1
+            skip = 0
+        return bytes(result)
+
+    def _decrypt_blocks(self, data: bytes, prev_cipher_block: int) -> bytes:
+        """Дешифрует блоки CBC, начиная с заданного значения сцепления"""
+        result = bytearray(len(data))
+        self._decrypt_into(data, result, prev_cipher_block)
+        return bytes(result)
+
+    def decrypt_parallel(
+        self,
+        data: Buffer,
+        workers: int,
+        min_shard_size: int = 1 << 16,
+        executor: Executor | None = None
+    ) -> bytes | bytearray:
+        """
+        Дешифрует данные CBC в пуле процессов.
+        Шифротекст один раз копируется в разделяемую память, и процессы
+        дешифруют свои шарды на месте, без передачи данных через pickle;
+        значением сцепления для каждого шарда служит последний блок
+        шифротекста перед ним. Без executor используется постоянный пул
+        parallel_pool(workers). Возвращает bytearray без дополнения.
+        """
+        length = len(data)  # type:ignore
+        if length % 8:
+            raise ValueError("Длина шифротекста должна быть кратна 8 байтам")
+        shard_count = min(workers, length // min_shard_size)
+        if shard_count < 2:
+            return self.decrypt(data)  # type:ignore
+
+        blocks = length // 8
+        bounds = [(blocks * i // shard_count) * 8 for i in range(shard_count + 1)]
+        shm = shared_memory.SharedMemory(create=True, size=length)
+        try:
+            shm.buf[:length] = data
+            tasks = []
+            for start, end in zip(bounds, bounds[1:]):
+                prev = self.iv if start == 0 else BLOCK.unpack_from(shm.buf, start - 8)[0]
+                tasks.append((shm.name, start, end, self.cryptor.key, self.k1, self.k2, prev))
+            for _ in (executor or parallel_pool(workers)).map(_decrypt_shard, tasks):
+                pass
+            with shm.buf[:length] as plaintext:
+                result = bytearray(plaintext)
+        finally:
+            shm.close()
+            shm.unlink()
+
+        end = length
+        while end and result[end - 1] == 0:
+            end -= 1
+        del result[end:]
+        return result
+
+    def encrypt_stream(self, source: BinaryIO | Iterable[bytes], sink: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+        """
+        Потоково шифрует данные, сохраняя состояние CBC между чанками.
+        Дополнение нулями выполняется только для последнего чанка.
+        Возвращает количество записанных байт шифротекста.
+        """
+        _check_chunk_size(chunk_size)
+        if self.mode == "ctr":
+            return self._ctr_stream(source, sink, chunk_size)
+        if self.mode != "cbc":
+            raise ValueError("Потоковый режим поддерживается только для CBC и CTR")
+        chunk_size -= chunk_size % 8
+        pending = b''
+        written = 0
+        for chunk in _iter_chunks(source, chunk_size):
+            pending += chunk
+            aligned = len(pending) - len(pending) % 8
+            if aligned >= chunk_size:
+                written += sink.write(self.encrypt(pending[:aligned]))
+                pending = pending[aligned:]
+        if pending:
+            written += sink.write(self.encrypt(pending))
+        return written
+
+    def decrypt_stream(self, source: BinaryIO | Iterable[bytes], sink: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+        """
+        Потоково дешифрует данные CBC.
+        Хвостовые нулевые байты удерживаются счётчиком и отбрасываются
+        только в конце потока, как и в decrypt().
+        Возвращает количество записанных байт открытого текста.
+        """
+        _check_chunk_size(chunk_size)
+        if self.mode == "ctr":
+            return self._ctr_stream(source, sink, chunk_size)
+        if self.mode != "cbc":
+            raise ValueError("Потоковый режим поддерживается только для CBC и CTR")
+        chunk_size -= chunk_size % 8
+        prev_cipher_block = self.iv
+        pending = b''
+        zeros = 0
+        written = 0
+        for chunk in _iter_chunks(source, chunk_size):
+            pending += chunk
+            aligned = len(pending) - len(pending) % 8
+            if aligned < chunk_size:
+                continue
+            decrypted = self._decrypt_blocks(pending[:aligned], prev_cipher_block)
+            prev_cipher_block = int.from_bytes(pending[aligned - 8:aligned], 'big')
+            pending = pending[aligned:]
+
+            stripped = decrypted.rstrip(b'\x00')
+            if stripped:
+                written += _write_zeros(sink, zeros) + sink.write(stripped)
+                zeros = 0
+            zeros += len(decrypted) - len(stripped)
+        if len(pending) % 8:
+            raise ValueError("Длина шифротекста должна быть кратна 8 байтам")
+        if pending:
+            stripped = self._decrypt_blocks(pending, prev_cipher_block).rstrip(b'\x00')
+            if stripped:
+                written += _write_zeros(sink, zeros) + sink.write(stripped)
+        return written
+
+    def _ctr_stream(self, source: BinaryIO | Iterable[bytes], sink: BinaryIO, chunk_size: int) -> int:
+        """Потоковая обработка CTR: состояние — только смещение в потоке"""
+        offset = 0
+        for chunk in _iter_chunks(source, chunk_size):
+            offset += sink.write(self.ctr_crypt(chunk, offset))
+        return offset
+
+def _check_chunk_size(chunk_size: int) -> None:
+    """Чанк меньше блока после выравнивания до кратности 8 стал бы пустым"""
+    if chunk_size < 8:
+        raise ValueError("Размер чанка должен быть не меньше 8 байт")
+
+def _iter_chunks(source: BinaryIO | Iterable[bytes], chunk_size: int) -> Iterator[bytes]:
+    """Читает чанки из файлоподобного объекта или итератора байтов"""
+    if hasattr(source, 'read'):
+        while chunk := source.read(chunk_size):  # type:ignore
+            yield chunk
+    else:
+        for chunk in source:
+            yield bytes(chunk)
+
+def _write_zeros(sink: BinaryIO, count: int) -> int:
+    """Записывает удержанные нулевые байты буферами фиксированного размера"""
+    written = 0
+    while count > 0:
+        size = min(count, STREAM_CHUNK_SIZE)
+        written += sink.write(b'\x00' * size)
+        count -= size
+    return written
+
+def _decrypt_shard(task: tuple[str, int, int, int, int, int, int]) -> None:
+    """Дешифрует один шард в разделяемой памяти на месте в рабочем процессе"""
+    name, start, end, des_key, k1, k2, prev = task
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        with shm.buf[start:end] as shard:
+            DESXCipher(des_key, k1, k2, prev)._decrypt_into(shard, shard, prev)
+    finally:
+        shm.close()
+
+# Постоянные пулы для decrypt_parallel по числу процессов: запуск пула
+# дороже дешифрования одного шарда, поэтому пул переиспользуется между вызовами
+_PARALLEL_POOLS: dict[int, ProcessPoolExecutor] = {}
+_PARALLEL_POOLS_LOCK = threading.Lock()
+
+def parallel_pool(workers: int) -> ProcessPoolExecutor:
+    """Общий пул из workers процессов, создаваемый при первом обращении"""
+    with _PARALLEL_POOLS_LOCK:
+        pool = _PARALLEL_POOLS.get(workers)
+        if pool is None:
+            pool = _PARALLEL_POOLS[workers] = ProcessPoolExecutor(max_workers=workers)
+        return pool
 
 class CryptoManager:
     """Управление криптографическими операциями"""
     
-    def __init__(self, key: int | None = None):
+    def __init__(
+        self,
+        key: int | None = None,
+        batch: bool = False,
+        workers: int = 1,
+        mode: str = "cbc",
+        engine: str = "numpy",
+        executor: Executor | None = None
+    ):
         self.iv = 0x0123456789ABCDEF
         self.k1 = 0xFEDCBA9876543210
         self.k2 = 0x543210FEDCBA9876
         self.des_key = key
+        self.batch = batch  # Пакетная обработка всех блоков за проход
+        self.engine = engine  # Пакетный движок: numpy (desx_batch) или bitslice (desx_bitslice)
+        self.workers = workers  # Число процессов для параллельного дешифрования CBC
+        self.executor = executor  # Пул для параллельного дешифрования; None — общий parallel_pool
+        self.mode = mode  # Режим DES-X: cbc, ctr или ecb
+        self.cryptor: DESCryptor | None = None  # Развёрнутое расписание ключей
 
     @classmethod
     def with_key(cls, key: int) -> Self:
         return cls(key)
 
+    @classmethod
+    def with_cryptor(cls, cryptor: DESCryptor) -> Self:
+        """Создаёт менеджер с заранее развёрнутым расписанием ключей"""
+        manager = cls(cryptor.key)
+        manager.cryptor = cryptor
+        return manager
+
+    def _cipher(self, nonce: int | None = None) -> DESXCipher:
+        """
+        Создаёт DESXCipher, переиспользуя развёрнутое расписание ключей.
+        В режиме CTR начальным значением счётчика служит нонс сообщения.
+        """
+        iv = self.iv
+        if self.mode == "ctr":
+            if nonce is None:
+                raise ValueError("Для режима CTR нужен нонс сообщения")
+            iv = nonce
+        cipher = DESXCipher(self.des_key, self.k1, self.k2, iv, self.cryptor, self.mode)  # type:ignore
+        self.cryptor = cipher.cryptor
+        return cipher
+
+    @staticmethod
+    def new_nonce() -> int:
+        """Случайный нонс CTR: повтор счётчика под тем же ключом раскрыл бы XOR открытых текстов"""
+        return secrets.randbits(64)
+
+    @staticmethod
+    def read_nonce(encrypted: Buffer) -> int:
+        """Нонс из начала шифротекста CTR"""
+        if len(encrypted) < NONCE_SIZE:  # type:ignore
+            raise ValueError("Шифротекст CTR короче нонса")
+        return BLOCK.unpack_from(encrypted)[0]
+
     def get_key(self) -> int:
         if not self.des_key:
             self.generate_key()
@@ -255,22 +772,243 @@ class CryptoManager:
 
     def encrypt_message(self, message: str) -> str:
         """Шифрует сообщение"""
-        if not self.des_key:
-            raise ValueError("Ключ не установлен")
-        
-        cipher = DESXCipher(self.des_key, self.k1, self.k2, self.iv)
-        encrypted = cipher.encrypt(message.encode())
-        return encrypted.hex()
+        return self.encrypt_bytes(message.encode()).hex()
 
     def decrypt_message(self, encrypted_hex: str) -> str:
         """Дешифрует сообщение"""
+        decrypted = self.decrypt_bytes(bytes.fromhex(encrypted_hex))
+        return decrypted.decode().strip('\x00')
+
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        """Шифрует байты без перевода в hex"""
         if not self.des_key:
             raise ValueError("Ключ не установлен")
         
-        cipher = DESXCipher(self.des_key, self.k1, self.k2, self.iv)
-        encrypted = bytes.fromhex(encrypted_hex)
-        decrypted = cipher.decrypt(encrypted)
-        return decrypted.decode().strip('\x00')
+        if self.mode == "ctr":
+            nonce = self.new_nonce()
+            return BLOCK.pack(nonce) + self._encrypt_body(data, nonce)
+        return self._encrypt_body(data)
+
+    def _encrypt_body(self, data: bytes, nonce: int | None = None) -> bytes:
+        cipher = self._cipher(nonce)
+        engine = self._bulk_engine()
+        if metrics.ENABLED:
+            metrics.increment("desx.bytes_encrypted", len(data))
+            metrics.increment("desx.blocks_encrypted", (len(data) + 7) // 8)
+        with metrics.timed("desx.encrypt", {"mode": self.mode}):
+            if engine is not None and self.mode != "cbc":
+                return engine.encrypt(cipher, data)
+            return cipher.encrypt(data)
+
+    def decrypt_bytes(self, encrypted: bytes | memoryview) -> bytes:
+        """Дешифрует байты без перевода из hex"""
+        if not self.des_key:
+            raise ValueError("Ключ не установлен")
+
+        nonce = None
+        if self.mode == "ctr":
+            nonce = self.read_nonce(encrypted)
+            encrypted = memoryview(encrypted)[NONCE_SIZE:]
+        cipher = self._cipher(nonce)
+        if metrics.ENABLED:
+            metrics.increment("desx.bytes_decrypted", len(encrypted))
+            metrics.increment("desx.blocks_decrypted", (len(encrypted) + 7) // 8)
+        with metrics.timed("desx.decrypt", {"mode": self.mode}):
+            if self.workers > 1 and self.mode == "cbc":
+                return cipher.decrypt_parallel(encrypted, self.workers, executor=self.executor)
+            engine = self._bulk_engine()
+            if engine is not None:
+                return engine.decrypt(cipher, encrypted)
+            return cipher.decrypt(encrypted)
+
+    def encrypt_authenticated(self, data: bytes) -> tuple[bytes, bytes]:
+        """
+        Шифрует байты в аутентифицированном режиме: тег SHA-256 шифротекста
+        вычисляется в том же проходе. Возвращает (шифротекст, тег).
+        Пакетные движки не используются, чтобы не делать второй проход.
+        """
+        if not self.des_key:
+            raise ValueError("Ключ не установлен")
+
+        if metrics.ENABLED:
+            metrics.increment("desx.bytes_encrypted", len(data))
+            metrics.increment("desx.blocks_encrypted", len(data) // 8 + 1)
+        with metrics.timed("desx.encrypt", {"mode": self.mode, "authenticated": "true"}):
+            if self.mode != "ctr":
+                return self._cipher().encrypt_authenticated(data)
+            # Нонс входит в тег, иначе его подмена прошла бы проверку
+            header = BLOCK.pack(self.new_nonce())
+            encrypted, tag = self._cipher(self.read_nonce(header)).encrypt_authenticated(data, header)
+            return header + encrypted, tag
+
+    def decrypt_authenticated(self, encrypted: bytes | memoryview, tag: bytes) -> bytes:
+        """Дешифрует байты с проверкой тега, вычисляемого в том же проходе"""
+        if not self.des_key:
+            raise ValueError("Ключ не установлен")
+
+        header = b''
+        if self.mode == "ctr":
+            header = bytes(encrypted[:NONCE_SIZE])
+            encrypted = memoryview(encrypted)[NONCE_SIZE:]
+        cipher = self._cipher(self.read_nonce(header) if header else None)
+        if metrics.ENABLED:
+            metrics.increment("desx.bytes_decrypted", len(encrypted))
+            metrics.increment("desx.blocks_decrypted", (len(encrypted) + 7) // 8)
+        with metrics.timed("desx.decrypt", {"mode": self.mode, "authenticated": "true"}):
+            try:
+                return cipher.decrypt_authenticated(encrypted, tag, header)
+            except ValueError:
+                metrics.increment("desx.tag_failures")
+                raise
+
+    def _bulk_engine(self) -> Any:
+        """Модуль пакетного движка или None, если пакетный режим недоступен"""
+        if not self.batch:
+            return None
+        if self.engine == "bitslice":
+            import desx_bitslice
+            return desx_bitslice
+        if self.engine == "numpy":
+            import desx_batch
+            return desx_batch if desx_batch.is_available() else None
+        raise ValueError(f"Неизвестный пакетный движок: {self.engine}")
+
+    def decrypt_range(self, encrypted: bytes | memoryview, offset: int, nonce: int) -> bytes:
+        """
+        Дешифрует фрагмент шифротекста CTR, начинающийся с байта offset
+        после нонса, не обрабатывая предшествующие данные.
+        nonce берётся из начала сообщения через read_nonce.
+        """
+        if self.mode != "ctr":
+            raise ValueError("Произвольный доступ поддерживается только в режиме CTR")
+        if not self.des_key:
+            raise ValueError("Ключ не установлен")
+        return self._cipher(nonce).ctr_crypt(encrypted, offset)
+
+    def encrypt_stream(self, source: BinaryIO | Iterable[bytes], sink: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+        """Потоково шифрует данные из source в sink; в режиме CTR поток начинается с нонса"""
+        if not self.des_key:
+            raise ValueError("Ключ не установлен")
+        if self.mode != "ctr":
+            return self._cipher().encrypt_stream(source, sink, chunk_size)
+        nonce = self.new_nonce()
+        written = sink.write(BLOCK.pack(nonce))
+        return written + self._cipher(nonce).encrypt_stream(source, sink, chunk_size)
+
+    def decrypt_stream(self, source: BinaryIO | Iterable[bytes], sink: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+        """Потоково дешифрует данные из source в sink"""
+        if not self.des_key:
+            raise ValueError("Ключ не установлен")
+        if self.mode != "ctr":
+            return self._cipher().decrypt_stream(source, sink, chunk_size)
+        _check_chunk_size(chunk_size)
+        chunks = _iter_chunks(source, chunk_size)
+        header = b''
+        for chunk in chunks:
+            header += chunk
+            if len(header) >= NONCE_SIZE:
+                break
+        nonce = self.read_nonce(header)
+        rest = header[NONCE_SIZE:]
+        body = itertools.chain((rest,) if rest else (), chunks)
+        return self._cipher(nonce).decrypt_stream(body, sink, chunk_size)
+
+    def encrypt_file(self, src_path: str, dst_path: str | None = None) -> int:
+        """
+        Шифрует файл через mmap: на месте (dst_path=None) или в заранее
+        выделенный файл. Блоки читаются и пишутся прямо в отображения.
+        Возвращает размер шифротекста.
+        """
+        if not self.des_key:
+            raise ValueError("Ключ не установлен")
+        size = os.path.getsize(src_path)
+        if self.mode != "ctr":
+            return _map_files(src_path, dst_path, size, size + (-size % 8), self._cipher().encrypt_into)
+
+        nonce = self.new_nonce()
+        cipher = self._cipher(nonce)
+
+        def encrypt_ctr(src: Buffer, dst: Buffer) -> int:
+            # Нонс записывается в начало, открытый текст на месте сдвигается за него
+            if src is dst:
+                dst.move(NONCE_SIZE, 0, size)  # type:ignore
+            with memoryview(dst) as view:  # type:ignore
+                body = view[NONCE_SIZE:]
+                cipher.encrypt_into(body if src is dst else src, body)
+                body.release()
+            BLOCK.pack_into(dst, 0, nonce)
+            return NONCE_SIZE + size
+
+        return _map_files(src_path, dst_path, size, NONCE_SIZE + size, encrypt_ctr)
+
+    def decrypt_file(self, src_path: str, dst_path: str | None = None) -> int:
+        """
+        Дешифрует файл через mmap на месте или в заранее выделенный файл.
+        Результат усекается до длины открытого текста, которую и возвращает.
+        """
+        if not self.des_key:
+            raise ValueError("Ключ не установлен")
+        size = os.path.getsize(src_path)
+        if self.mode != "ctr":
+            return _map_files(src_path, dst_path, size, size, self._cipher().decrypt_into)
+        if size < NONCE_SIZE:
+            raise ValueError("Шифротекст CTR короче нонса")
+
+        def decrypt_ctr(src: Buffer, dst: Buffer) -> int:
+            cipher = self._cipher(self.read_nonce(src))
+            with memoryview(src) as view:  # type:ignore
+                body = view[NONCE_SIZE:]
+                cipher.decrypt_into(body, body if src is dst else dst)
+                body.release()
+            if src is dst:
+                dst.move(0, NONCE_SIZE, size - NONCE_SIZE)  # type:ignore
+            return size - NONCE_SIZE
+
+        return _map_files(src_path, dst_path, size, size, decrypt_ctr)
+
+def _map_files(
+    src_path: str,
+    dst_path: str | None,
+    size: int,
+    out_size: int,
+    process: Callable[[Buffer, Buffer], int]
+) -> int:
+    """
+    Отображает исходный и целевой файлы в память и вызывает process(src, dst).
+    Целевой файл заранее расширяется до out_size, а после обработки
+    усекается до длины, которую вернул process.
+    """
+    # samefile распознаёт и символические, и жёсткие ссылки на исходный файл
+    in_place = dst_path is None or (os.path.exists(dst_path) and os.path.samefile(src_path, dst_path))
+    if in_place:
+        with open(src_path, "r+b") as dst_file:
+            dst_file.truncate(out_size)
+            if out_size == 0:
+                return 0
+            with mmap.mmap(dst_file.fileno(), out_size) as dst:
+                # Дополнение нулями уже появилось при расширении файла
+                length = process(dst, dst)
+                dst.flush()
+            dst_file.truncate(length)
+        return length
+
+    with open(src_path, "rb") as src_file:
+        # Исходный файл отображается до того, как целевой будет создан или усечён
+        src = mmap.mmap(src_file.fileno(), size, access=mmap.ACCESS_READ) if size else b''
+        try:
+            fd = os.open(dst_path, os.O_RDWR | os.O_CREAT, 0o666)  # type:ignore
+            with open(fd, "r+b") as dst_file:
+                dst_file.truncate(out_size)
+                if out_size == 0:
+                    return 0
+                with mmap.mmap(dst_file.fileno(), out_size) as dst:
+                    length = process(src, dst)
+                    dst.flush()
+                dst_file.truncate(length)
+        finally:
+            if size:
+                src.close()  # type:ignore
+    return length
 
 def main():
     manager = CryptoManager()
@@ -0,0 +1,150 @@
+import random
+import threading
+from collections import deque
+from typing import Any, Callable
+
+import metrics
+from desx import CryptoManager, DESCryptor
+from rabin import generate_keys as generate_rabin_keys
+from rsa import RSAKeyPair, generate_rsa_keys
+
+# Пауза перед повторным пополнением после ошибки генерации, чтобы
+# постоянно падающая фабрика не загружала процессор
+REFILL_RETRY_DELAY = 1.0
+
+class _Pool:
+    """Ограниченный пул готовых объектов со счётчиками попаданий и промахов"""
+
+    def __init__(self, factory: Callable[[], Any], capacity: int, low_water: int):
+        self.factory = factory
+        self.capacity = capacity
+        self.low_water = min(low_water, capacity)
+        self.items: deque = deque()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0  # Ошибки фабрики при фоновом пополнении
+        self.refilling = False
+
+    def needs_refill(self) -> bool:
+        """
+        Пополнение начинается, когда пул опускается до low_water,
+        и продолжается до заполнения capacity. Вызывается под блокировкой.
+        """
+        if len(self.items) >= self.capacity:
+            self.refilling = False
+        elif len(self.items) <= self.low_water:
+            self.refilling = True
+        return self.refilling
+
+class KeyFactory:
+    """
+    Фабрика ключей: держит пулы готовых сеансовых ключей DES-X
+    (с развёрнутыми раундовыми ключами) и пар ключей RSA/Рабина.
+    Фоновый поток начинает пополнять пул, когда он опускается до low_water,
+    и заполняет его до capacity.
+    """
+
+    def __init__(
+        self,
+        session_keys: int = 64,
+        low_water: int = 16,
+        rsa_keys: int = 0,
+        rabin_keys: int = 0,
+        rsa_bits: int = 1024,
+        rabin_bits: int = 512
+    ):
+        self._pools = {
+            "session": _Pool(self._new_session_key, session_keys, low_water),
+            "rsa": _Pool(lambda: generate_rsa_keys(rsa_bits), rsa_keys, max(rsa_keys // 2, 0)),
+            "rabin": _Pool(lambda: generate_rabin_keys(rabin_bits), rabin_keys, max(rabin_keys // 2, 0))
+        }
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopped = False
+
+    @staticmethod
+    def _new_session_key() -> DESCryptor:
+        # Одноразовые сеансовые ключи не кладутся в общий кэш расписаний
+        return DESCryptor(random.getrandbits(64), cache=None)
+
+    def start(self) -> "KeyFactory":
+        """Запускает фоновый поток пополнения пулов"""
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._refill_loop, name="key-factory", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Останавливает фоновый поток"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "KeyFactory":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _refill_loop(self) -> None:
+        while True:
+            with self._condition:
+                while not self._stopped and not any(p.needs_refill() for p in self._pools.values()):
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                name, pool = next((n, p) for n, p in self._pools.items() if p.needs_refill())
+            # Генерация выполняется вне блокировки, чтобы не задерживать потребителей
+            try:
+                item = pool.factory()
+            except Exception:
+                # Ошибка не должна останавливать поток: пул пополнится при следующей попытке
+                metrics.increment("keypool.refill_errors", 1, {"pool": name})
+                with self._condition:
+                    pool.errors += 1
+                    if not self._stopped:
+                        self._condition.wait(REFILL_RETRY_DELAY)
+                continue
+            with self._condition:
+                if len(pool.items) < pool.capacity:
+                    pool.items.append(item)
+
+    def _take(self, name: str) -> Any:
+        pool = self._pools[name]
+        with self._condition:
+            if pool.items:
+                pool.hits += 1
+                item = pool.items.popleft()
+            else:
+                pool.misses += 1
+                item = None
+            if pool.needs_refill():
+                self._condition.notify()
+        # При промахе объект создаётся синхронно в вызывающем потоке
+        return pool.factory() if item is None else item
+
+    def get_session_cryptor(self) -> DESCryptor:
+        """Возвращает DESCryptor со случайным ключом и готовым расписанием"""
+        return self._take("session")
+
+    def get_session_manager(self) -> CryptoManager:
+        """Возвращает CryptoManager с новым сеансовым ключом из пула"""
+        return CryptoManager.with_cryptor(self.get_session_cryptor())
+
+    def get_rsa_keys(self) -> RSAKeyPair:
+        return self._take("rsa")
+
+    def get_rabin_keys(self) -> tuple[tuple[int, int, int, int, int], int]:
+        return self._take("rabin")
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Размеры пулов, счётчики попаданий/промахов и ошибок фонового пополнения"""
+        with self._condition:
+            return {
+                name: {"size": len(pool.items), "hits": pool.hits, "misses": pool.misses, "errors": pool.errors}
+                for name, pool in self._pools.items()
+            }
@@ -0,0 +1,202 @@
+import mmap
+import os
+import struct
+import tempfile
+
+from rabin import RabinPrivateKey, generate_keys as generate_rabin_keys
+from rsa import RSAKeyPair, generate_rsa_keys
+
+MAGIC = b'DXKS'
+VERSION = 1
+# Заголовок файла: сигнатура, версия формата, число записей
+FILE_HEADER = struct.Struct('>4sBH')
+# Заголовок записи: тип ключа, версия ключа, длина имени, число полей
+ENTRY_HEADER = struct.Struct('>BIBB')
+FIELD_LENGTH = struct.Struct('>H')
+# Права файла хранилища: только владелец
+FILE_MODE = 0o600
+
+KIND_RSA = 1
+KIND_RABIN = 2
+
+# Порядок полей в записи, включая заранее вычисленные значения CRT
+RSA_FIELDS = ('n', 'public_key', 'private_key', 'p', 'q', 'd_p', 'd_q', 'q_inv')
+# Порядок задан явно, чтобы формат файла не зависел от порядка __slots__
+RABIN_FIELDS = ('p', 'q', 'a', 'b', 'n', 'exp_p', 'exp_q', 'coef_p', 'coef_q')
+
+Key = RSAKeyPair | RabinPrivateKey
+
+def _encode_int(value: int | None) -> bytes:
+    """
+    Поле: 2 байта длины и знаковое число big-endian (коэффициенты Безу
+    ключа Рабина бывают отрицательными); пустое поле означает None.
+    """
+    data = b'' if value is None else value.to_bytes(value.bit_length() // 8 + 1, 'big', signed=True)
+    return FIELD_LENGTH.pack(len(data)) + data
+
+def _take(view: memoryview, offset: int, size: int) -> bytes:
+    """
+    Байты [offset, offset + size) с проверкой, что они целиком лежат в буфере.
+    Возвращается копия, чтобы при ошибке разбора на отображённый файл
+    не оставалось ссылок и его можно было закрыть.
+    """
+    if offset + size > len(view):
+        raise ValueError("Хранилище обрезано")
+    return view[offset:offset + size].tobytes()
+
+def _restore(cls: type, names: tuple[str, ...], values: list[int | None]) -> Key:
+    """Создаёт ключ без пересчёта производных значений в __init__"""
+    key = cls.__new__(cls)
+    for name, value in zip(names, values):
+        setattr(key, name, value)
+    return key
+
+class KeyStore:
+    """
+    Хранилище ключей RSA и Рабина с именованными версиями для ротации.
+    Ключи сохраняются в компактный двоичный файл вместе с заранее
+    вычисленными значениями CRT и загружаются без генерации и пересчёта.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, dict[int, Key]] = {}
+
+    def put(self, name: str, key: Key, version: int | None = None) -> int:
+        """Добавляет ключ; без явной версии назначается следующая. Возвращает версию."""
+        versions = self._entries.setdefault(name, {})
+        if version is None:
+            version = max(versions, default=0) + 1
+        versions[version] = key
+        return version
+
+    def get(self, name: str, version: int | None = None) -> Key:
+        """Возвращает ключ заданной версии или самой новой"""
+        versions = self._entries.get(name)
+        if not versions:
+            raise KeyError(f"Ключ не найден: {name}")
+        if version is None:
+            version = max(versions)
+        if version not in versions:
+            raise KeyError(f"Версия {version} ключа {name} не найдена")
+        return versions[version]
+
+    def versions(self, name: str) -> list[int]:
+        return sorted(self._entries.get(name, {}))
+
+    def names(self) -> list[str]:
+        return sorted(self._entries)
+
+    def remove(self, name: str, version: int) -> None:
+        """Удаляет версию ключа, например после завершения ротации"""
+        del self._entries[name][version]
+        if not self._entries[name]:
+            del self._entries[name]
+
+    def to_bytes(self) -> bytes:
+        parts = []
+        count = 0
+        for name, versions in sorted(self._entries.items()):
+            encoded_name = name.encode()
+            for version, key in sorted(versions.items()):
+                if isinstance(key, RSAKeyPair):
+                    kind, fields = KIND_RSA, RSA_FIELDS
+                else:
+                    kind, fields = KIND_RABIN, RABIN_FIELDS
+                parts.append(ENTRY_HEADER.pack(kind, version, len(encoded_name), len(fields)))
+                parts.append(encoded_name)
+                parts.extend(_encode_int(getattr(key, field)) for field in fields)
+                count += 1
+        return FILE_HEADER.pack(MAGIC, VERSION, count) + b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes | memoryview | mmap.mmap) -> "KeyStore":
+        with memoryview(data) as view:
+            return cls._parse(view)
+
+    @classmethod
+    def _parse(cls, view: memoryview) -> "KeyStore":
+        magic, version, count = FILE_HEADER.unpack_from(_take(view, 0, FILE_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("Файл не является хранилищем ключей")
+        if version != VERSION:
+            raise ValueError(f"Неподдерживаемая версия хранилища: {version}")
+
+        store = cls()
+        offset = FILE_HEADER.size
+        for _ in range(count):
+            kind, key_version, name_length, field_count = ENTRY_HEADER.unpack(
+                _take(view, offset, ENTRY_HEADER.size)
+            )
+            offset += ENTRY_HEADER.size
+            if kind == KIND_RSA:
+                key_class, fields = RSAKeyPair, RSA_FIELDS
+            elif kind == KIND_RABIN:
+                key_class, fields = RabinPrivateKey, RABIN_FIELDS
+            else:
+                raise ValueError(f"Неизвестный тип ключа: {kind}")
+            if field_count != len(fields):
+                raise ValueError(f"Неверное число полей ключа: {field_count}")
+
+            name = _take(view, offset, name_length).decode()
+            offset += name_length
+            values: list[int | None] = []
+            for _ in range(field_count):
+                (length,) = FIELD_LENGTH.unpack(_take(view, offset, FIELD_LENGTH.size))
+                offset += FIELD_LENGTH.size
+                field = _take(view, offset, length)
+                values.append(int.from_bytes(field, 'big', signed=True) if length else None)
+                offset += length
+            store.put(name, _restore(key_class, fields, values), key_version)
+
+        if offset != len(view):
+            raise ValueError("Лишние данные в конце хранилища")
+        return store
+
+    def save(self, path: str) -> None:
+        """
+        Атомарно записывает хранилище: сначала во временный файл, затем замена.
+        Файл содержит закрытые ключи, поэтому создаётся с правами 0600
+        под непредсказуемым именем до записи данных.
+        """
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(path) or "."
+        )
+        try:
+            os.fchmod(fd, FILE_MODE)
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.to_bytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "KeyStore":
+        """Загружает хранилище, отображая файл в память"""
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return cls.from_bytes(data)
+
+def load_or_generate(
+    path: str,
+    rsa_bits: int = 1024,
+    rabin_bits: int = 512
+) -> tuple[RabinPrivateKey, RSAKeyPair]:
+    """
+    Возвращает самые новые ключи "rabin" и "rsa" из хранилища path.
+    Если файла или ключей нет, они генерируются один раз и сохраняются.
+    """
+    store = KeyStore.load(path) if os.path.exists(path) else KeyStore()
+    changed = False
+    if not store.versions("rabin"):
+        rabin_private, _ = generate_rabin_keys(rabin_bits)
+        store.put("rabin", RabinPrivateKey.from_tuple(rabin_private))
+        changed = True
+    if not store.versions("rsa"):
+        store.put("rsa", generate_rsa_keys(rsa_bits))
+        changed = True
+    if changed:
+        store.save(path)
+    return store.get("rabin"), store.get("rsa")  # type:ignore
@@ -0,0 +1,110 @@
+import argparse
+import json
+import random
+import string
+import sys
+import threading
+import time
+
+from bench import percentile
+from daemon import DEFAULT_ADDRESS, OP_DECRYPT, OP_ENCRYPT, OP_SIGN, OP_VERIFY, encode_verify_item
+from daemon_client import DaemonClient
+
+OPS = {"encrypt": OP_ENCRYPT, "decrypt": OP_DECRYPT, "sign": OP_SIGN, "verify": OP_VERIFY}
+
+def prepare_items(client: DaemonClient, op: str, batch: int, size: int) -> list[bytes]:
+    """Элементы одного пакета; для decrypt и verify они готовятся самой службой"""
+    plaintexts = ["".join(random.choices(string.ascii_letters, k=size)) for _ in range(batch)]
+    if op in ("encrypt", "sign"):
+        return [p.encode() for p in plaintexts]
+    if op == "decrypt":
+        return [result.to_bytes() for result in client.encrypt(plaintexts)]  # type:ignore
+    signatures = client.sign(plaintexts)
+    return [encode_verify_item(p.encode(), s) for p, s in zip(plaintexts, signatures)]  # type:ignore
+
+def run(
+    address: str,
+    op: str,
+    requests: int,
+    concurrency: int,
+    batch: int,
+    pipeline: int,
+    size: int
+) -> dict:
+    """
+    Отправляет requests кадров из concurrency потоков. Каждый поток за один
+    обмен отправляет pipeline кадров по batch элементов. Задержка измеряется
+    для каждого обмена.
+    """
+    client = DaemonClient(address, pool_size=concurrency)
+    items = prepare_items(client, op, batch, size)
+    code = OPS[op]
+    rounds = (requests + pipeline - 1) // pipeline
+    counter = iter(range(rounds))
+    lock = threading.Lock()
+    latencies: list[float] = []
+    errors = 0
+
+    def worker() -> None:
+        nonlocal errors
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            start = time.perf_counter()
+            try:
+                results = client.call_many([(code, items)] * pipeline)
+                failed = sum(isinstance(r, Exception) for response in results for r in response)
+            except (OSError, ValueError):
+                failed = batch * pipeline
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                errors += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    client.close()
+
+    frames = len(latencies) * pipeline
+    return {
+        "op": op,
+        "frames": frames,
+        "items": frames * batch,
+        "errors": errors,
+        "seconds": elapsed,
+        "requests_per_s": frames / elapsed,
+        "items_per_s": frames * batch / elapsed,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * 1e3,
+            "p90": percentile(latencies, 90) * 1e3,
+            "p99": percentile(latencies, 99) * 1e3,
+            "max": max(latencies) * 1e3
+        }
+    }
+
+def main_cli(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Генератор нагрузки для локальной службы шифрования")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help='"хост:порт" или "unix:/путь"')
+    parser.add_argument("--op", choices=list(OPS), default="encrypt", help="операция")
+    parser.add_argument("--requests", type=int, default=1000, help="число кадров")
+    parser.add_argument("--concurrency", type=int, default=8, help="число клиентских потоков")
+    parser.add_argument("--batch", type=int, default=1, help="элементов в кадре")
+    parser.add_argument("--pipeline", type=int, default=1, help="кадров за один обмен")
+    parser.add_argument("--size", type=int, default=64, help="размер сообщения в символах")
+    args = parser.parse_args(argv)
+
+    report = run(args.address, args.op, args.requests, args.concurrency, args.batch, args.pipeline, args.size)
+    latency = report["latency_ms"]
+    print(f"{report['op']}: {report['requests_per_s']:.1f} запросов/с, {report['items_per_s']:.1f} элементов/с, "
+          f"p50={latency['p50']:.3f} мс, p90={latency['p90']:.3f} мс, p99={latency['p99']:.3f} мс, "
+          f"ошибок: {report['errors']}", file=sys.stderr)
+    json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main_cli()
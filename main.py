@@ -1,67 +1,758 @@
-from desx import CryptoManager as DESX
+import metrics
+from cache import LRUCache
+from desx import STREAM_CHUNK_SIZE, CryptoManager as DESX, DESCryptor
+from keypool import KeyFactory
 from rabin import (
     generate_keys as generate_rabin_keys, 
     encrypt as encrypt_rabin, 
-    decrypt as decrypt_rabin
+    encrypt_many as encrypt_rabin_many,
+    decrypt as decrypt_rabin,
+    RabinPrivateKey
 )
 from rsa import (
     RSAKeyPair,
     RSASignature,
     sign_message,
     verify_signature,
+    verify_signatures,
     generate_rsa_keys
 )
 
-from typing import NamedTuple
+import hashlib
+import hmac
+import os
+import struct
+from functools import partial
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import BinaryIO, Callable, Iterable, Iterator, NamedTuple, Sequence
+
+WIRE_VERSION = 2
+# Заголовок: версия, размер поля ключа, размер поля подписи, размер тега, длина шифротекста
+WIRE_HEADER = struct.Struct('>BHHBQ')
+# Заголовок версии 1 (без тега целостности), поддерживается при разборе
+LEGACY_WIRE_VERSION = 1
+LEGACY_WIRE_HEADER = struct.Struct('>BHHQ')
+
+def _byte_length(value: int) -> int:
+    """Число байт big-endian записи неотрицательного value (не меньше 1)"""
+    return (value.bit_length() + 7) // 8 or 1
 
 class EncryptionResult(NamedTuple):
-    encrypted_message: str
+    encrypted_message: bytes | memoryview
     encrypted_key: int
     signature: RSASignature
+    # SHA-256 шифротекста, обязателен для контейнеров версии 2
+    tag: bytes = b''
+    # Версия контейнера: версия 1 — старый формат без проверки целостности
+    version: int = WIRE_VERSION
+
+    def to_bytes(self, rabin_public_key: int | None = None, rsa_key_pair: RSAKeyPair | None = None) -> bytes:
+        """
+        Сериализует результат в двоичный контейнер:
+        заголовок WIRE_HEADER, ключ и подпись фиксированной ширины (big-endian),
+        тег, затем шифротекст без перекодирования.
+        Ширина полей равна длине модуля Рабина и модуля RSA в байтах, поэтому
+        не меняется от сообщения к сообщению; без ключей берётся наименьшая
+        ширина, вмещающая значение.
+        """
+        key_size = _byte_length(rabin_public_key if rabin_public_key is not None else self.encrypted_key)
+        signature_size = _byte_length(
+            rsa_key_pair.n if rsa_key_pair is not None else self.signature.signature
+        )
+        if self.version == LEGACY_WIRE_VERSION:
+            header = LEGACY_WIRE_HEADER.pack(
+                LEGACY_WIRE_VERSION, key_size, signature_size, len(self.encrypted_message)
+            )
+        else:
+            header = WIRE_HEADER.pack(
+                WIRE_VERSION, key_size, signature_size, len(self.tag), len(self.encrypted_message)
+            )
+        return b''.join((
+            header,
+            self.encrypted_key.to_bytes(key_size, 'big'),
+            self.signature.signature.to_bytes(signature_size, 'big'),
+            self.tag,
+            self.encrypted_message
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes | bytearray | memoryview) -> "EncryptionResult":
+        """
+        Разбирает двоичный контейнер без копирования:
+        шифротекст возвращается как memoryview исходного буфера.
+        """
+        view = memoryview(data)
+        if not view or view[0] not in (WIRE_VERSION, LEGACY_WIRE_VERSION):
+            raise ValueError(f"Неподдерживаемая версия контейнера: {view[0] if view else None}")
+        header = WIRE_HEADER if view[0] == WIRE_VERSION else LEGACY_WIRE_HEADER
+        if len(view) < header.size:
+            raise ValueError("Контейнер обрезан: заголовок неполон")
+        if header is WIRE_HEADER:
+            _, key_size, signature_size, tag_size, message_size = header.unpack_from(view)
+        else:
+            _, key_size, signature_size, message_size = header.unpack_from(view)
+            tag_size = 0
+
+        key_start = header.size
+        signature_start = key_start + key_size
+        tag_start = signature_start + signature_size
+        message_start = tag_start + tag_size
+        if len(view) != message_start + message_size:
+            raise ValueError("Размер контейнера не совпадает с заголовком")
+
+        return cls(
+            encrypted_message=view[message_start:],
+            encrypted_key=int.from_bytes(view[key_start:signature_start], 'big'),
+            signature=RSASignature(int.from_bytes(view[signature_start:tag_start], 'big')),
+            tag=view[tag_start:message_start].tobytes(),
+            version=view[0]
+        )
+
+ENVELOPE_VERSION = 2
+# Заголовок конверта: версия, число получателей, размер поля подписи, размер тега, длина шифротекста
+ENVELOPE_HEADER = struct.Struct('>BHHBQ')
+# Заголовок версии 1 (без тега целостности), поддерживается при разборе
+LEGACY_ENVELOPE_VERSION = 1
+LEGACY_ENVELOPE_HEADER = struct.Struct('>BHHQ')
+ENVELOPE_KEY_LENGTH = struct.Struct('>H')
+# Ключ DES-X занимает младшие 64 бита, выше добавляется соль получателя
+SESSION_KEY_BITS = 64
+
+class Envelope(NamedTuple):
+    """Сообщение для нескольких получателей: общий шифротекст и ключ для каждого"""
+    encrypted_message: bytes | memoryview
+    encrypted_keys: tuple[int, ...]
+    signature: RSASignature
+    # SHA-256 шифротекста, обязателен для конвертов версии 2
+    tag: bytes = b''
+    # Версия конверта: версия 1 — старый формат без проверки целостности
+    version: int = ENVELOPE_VERSION
+
+    def to_bytes(self) -> bytes:
+        """
+        Сериализует конверт: заголовок ENVELOPE_HEADER, подпись, тег,
+        ключи получателей с 2-байтовым префиксом длины, затем шифротекст.
+        """
+        signature_size = (self.signature.signature.bit_length() + 7) // 8 or 1
+        if self.version == LEGACY_ENVELOPE_VERSION:
+            header = LEGACY_ENVELOPE_HEADER.pack(
+                LEGACY_ENVELOPE_VERSION, len(self.encrypted_keys), signature_size, len(self.encrypted_message)
+            )
+        else:
+            header = ENVELOPE_HEADER.pack(
+                ENVELOPE_VERSION, len(self.encrypted_keys), signature_size,
+                len(self.tag), len(self.encrypted_message)
+            )
+        parts = [header, self.signature.signature.to_bytes(signature_size, 'big'), self.tag]
+        for key in self.encrypted_keys:
+            data = key.to_bytes((key.bit_length() + 7) // 8 or 1, 'big')
+            parts.append(ENVELOPE_KEY_LENGTH.pack(len(data)))
+            parts.append(data)
+        parts.append(self.encrypted_message)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes | bytearray | memoryview) -> "Envelope":
+        """Разбирает конверт без копирования шифротекста"""
+        view = memoryview(data)
+        if not view or view[0] not in (ENVELOPE_VERSION, LEGACY_ENVELOPE_VERSION):
+            raise ValueError(f"Неподдерживаемая версия конверта: {view[0] if view else None}")
+        header = ENVELOPE_HEADER if view[0] == ENVELOPE_VERSION else LEGACY_ENVELOPE_HEADER
+        if len(view) < header.size:
+            raise ValueError("Конверт обрезан: заголовок неполон")
+        if header is ENVELOPE_HEADER:
+            _, count, signature_size, tag_size, message_size = header.unpack_from(view)
+        else:
+            _, count, signature_size, message_size = header.unpack_from(view)
+            tag_size = 0
+
+        offset = header.size
+        signature = RSASignature(int.from_bytes(view[offset:offset + signature_size], 'big'))
+        offset += signature_size
+        tag = view[offset:offset + tag_size].tobytes()
+        offset += tag_size
+        keys = []
+        for _ in range(count):
+            if len(view) < offset + ENVELOPE_KEY_LENGTH.size:
+                raise ValueError("Конверт обрезан: заголовок неполон")
+            (length,) = ENVELOPE_KEY_LENGTH.unpack_from(view, offset)
+            offset += ENVELOPE_KEY_LENGTH.size
+            keys.append(int.from_bytes(view[offset:offset + length], 'big'))
+            offset += length
+        if len(view) != offset + message_size:
+            raise ValueError("Размер конверта не совпадает с заголовком")
+
+        return cls(
+            encrypted_message=view[offset:], encrypted_keys=tuple(keys), signature=signature,
+            tag=tag, version=view[0]
+        )
+
+# Кэш проверенных сеансовых ключей: повторная расшифровка сообщения с тем же
+# зашифрованным ключом, подписью и тегом не требует проверки подписи и Рабина
+UNWRAP_CACHE = LRUCache(maxsize=1024)
+
+def configure_unwrap_cache(maxsize: int = 1024, ttl: float | None = None) -> LRUCache:
+    """Задаёт размер и время жизни кэша проверенных сеансовых ключей"""
+    UNWRAP_CACHE.clear()
+    UNWRAP_CACHE.maxsize = maxsize
+    UNWRAP_CACHE.ttl = ttl
+    return UNWRAP_CACHE
+
+def key_fingerprint(
+    rabin_private_key: tuple[int, int, int, int, int] | RabinPrivateKey,
+    rsa_key_pair: RSAKeyPair
+) -> tuple[int, int, int]:
+    """Отпечаток пары ключей получателя: модуль Рабина, модуль и экспонента RSA"""
+    rabin_n = rabin_private_key.n if isinstance(rabin_private_key, RabinPrivateKey) else rabin_private_key[4]
+    return rabin_n, rsa_key_pair.n, rsa_key_pair.public_key
+
+def invalidate_unwrap_cache(
+    rabin_private_key: tuple[int, int, int, int, int] | RabinPrivateKey | None = None,
+    rsa_key_pair: RSAKeyPair | None = None
+) -> int:
+    """
+    Удаляет из кэша ключи, проверенные заданной парой ключей, например при
+    ротации; без аргументов очищает кэш целиком. Возвращает число удалённых записей.
+    """
+    if rabin_private_key is None or rsa_key_pair is None:
+        removed = len(UNWRAP_CACHE)
+        UNWRAP_CACHE.clear()
+        return removed
+    fingerprint = key_fingerprint(rabin_private_key, rsa_key_pair)
+    return UNWRAP_CACHE.invalidate_if(lambda key: key[-1] == fingerprint)
+
+def _unwrap_cache_key(
+    result: "EncryptionResult",
+    fingerprint: tuple[int, int, int]
+) -> tuple:
+    # Тег входит в ключ: подпись покрывает его, и без него попадание
+    # позволило бы подменить шифротекст вместе с тегом
+    return result.encrypted_key, result.signature.signature, result.tag, fingerprint
+
+def _cached_session_key(cache: LRUCache | None, key: tuple) -> int | None:
+    """Ищет проверенный сеансовый ключ и учитывает попадание в метриках"""
+    if cache is None:
+        return None
+    desx_key = cache.get(key)
+    metrics.increment("unwrap_cache.hits" if desx_key is not None else "unwrap_cache.misses")
+    return desx_key
+
+def _check_version(version: int, tag: bytes, legacy_version: int, allow_legacy: bool) -> None:
+    """
+    Проверяет, что способ проверки тела определяется версией контейнера:
+    версия 1 без тега принимается только при явном allow_legacy,
+    в остальных версиях тег обязателен.
+    """
+    if version == legacy_version:
+        if not allow_legacy:
+            raise ValueError("Контейнер версии 1 без проверки целостности; передайте allow_legacy=True")
+    elif not tag:
+        raise ValueError("Нет тега целостности")
+
+def _signed_data(encrypted_key: int, tag: bytes, version: int = WIRE_VERSION) -> str:
+    """
+    Данные, покрываемые подписью: зашифрованный ключ и тег шифротекста.
+    Для контейнеров версии 1 подписывается только ключ.
+    """
+    if version == LEGACY_WIRE_VERSION:
+        return str(encrypted_key)
+    return f"{encrypted_key}:{tag.hex()}"
+
+def _envelope_signed_data(encrypted_keys: Sequence[int], tag: bytes, version: int = ENVELOPE_VERSION) -> str:
+    """
+    Данные, покрываемые подписью конверта: ключи всех получателей и тег шифротекста.
+    Для конвертов версии 1 подписывается только список ключей.
+    """
+    keys = ",".join(map(str, encrypted_keys))
+    return keys if version == LEGACY_ENVELOPE_VERSION else f"{keys}:{tag.hex()}"
+
+def _decrypt_body(desx: DESX, encrypted_message: bytes | memoryview, tag: bytes, legacy: bool) -> bytes:
+    """Дешифрует тело с проверкой тега; тело контейнера версии 1 — без проверки"""
+    if legacy:
+        return desx.decrypt_bytes(encrypted_message)
+    return desx.decrypt_authenticated(encrypted_message, tag)
+
+def _session_manager(key_factory: KeyFactory | None = None) -> DESX:
+    """
+    Менеджер DES-X с новым сеансовым ключом: из фонового пула, если он задан.
+    Одноразовый ключ, как и в KeyFactory, не кладётся в общий кэш расписаний,
+    иначе он вытеснял бы из него долгоживущие расписания.
+    """
+    if key_factory is not None:
+        # Сеансовый ключ с готовым расписанием из фонового пула
+        return key_factory.get_session_manager()
+    desx = DESX()
+    desx.generate_key()
+    return DESX.with_cryptor(DESCryptor(desx.get_key(), cache=None))
 
 def encrypt(
     plaintext: str,
     rabin_public_key: int,
-    rsa_key_pair: RSAKeyPair    
+    rsa_key_pair: RSAKeyPair,
+    key_factory: KeyFactory | None = None
 ) -> EncryptionResult:
     
-    desx = DESX()
-    desx.generate_key()
-    desx_key = desx.get_key()
+    with metrics.timed("desx.keygen"):
+        desx = _session_manager(key_factory)
+        desx_key = desx.get_key()
 
-    encrypted_message = desx.encrypt_message(plaintext)
+    # Тег шифротекста вычисляется в том же проходе и связывается с ключом подписью
+    encrypted_message, tag = desx.encrypt_authenticated(plaintext.encode())
 
-    encrypted_desx_key = encrypt_rabin(desx_key, rabin_public_key)
+    with metrics.timed("rabin.encrypt"):
+        encrypted_desx_key = encrypt_rabin(desx_key, rabin_public_key)
 
-    signature = sign_message(str(encrypted_desx_key), rsa_key_pair)
+    with metrics.timed("rsa.sign"):
+        signature = sign_message(_signed_data(encrypted_desx_key, tag), rsa_key_pair)
 
     return EncryptionResult(
         encrypted_message=encrypted_message,
         encrypted_key=encrypted_desx_key,
-        signature=signature
+        signature=signature,
+        tag=tag
     )
 
 def decrypt(
         encryption_result: EncryptionResult,
-        rabin_private_key: tuple[int, int, int, int, int],
-        rsa_key_pair: RSAKeyPair
+        rabin_private_key: tuple[int, int, int, int, int] | RabinPrivateKey,
+        rsa_key_pair: RSAKeyPair,
+        cache: LRUCache | None = UNWRAP_CACHE,
+        allow_legacy: bool = False
 ) -> str:
-    encrypted_message, encrypted_desx_key, signature = encryption_result
+    """
+    Дешифрует результат encrypt. Контейнеры версии 1 без тега целостности
+    принимаются только при allow_legacy=True.
+    """
+    encrypted_message, encrypted_desx_key, signature, tag, version = encryption_result
+    _check_version(version, tag, LEGACY_WIRE_VERSION, allow_legacy)
 
-    if not verify_signature(str(encrypted_desx_key), signature, rsa_key_pair):
-        raise ValueError("Подпись неверна")
-    
-    desx_key = decrypt_rabin(encrypted_desx_key, rabin_private_key)
+    cache_key = _unwrap_cache_key(encryption_result, key_fingerprint(rabin_private_key, rsa_key_pair))
+    desx_key = _cached_session_key(cache, cache_key)
+    if desx_key is None:
+        with metrics.timed("rsa.verify"):
+            is_valid = verify_signature(_signed_data(encrypted_desx_key, tag, version), signature, rsa_key_pair)
+        if not is_valid:
+            metrics.increment("rsa.verify_failures")
+            raise ValueError("Подпись неверна")
+
+        with metrics.timed("rabin.decrypt"):
+            desx_key = decrypt_rabin(encrypted_desx_key, rabin_private_key)
+        if cache is not None:
+            cache.put(cache_key, desx_key)
 
     desx = DESX(desx_key)
 
-    decrypted_message = desx.decrypt_message(encrypted_message)
+    decrypted_message = _decrypt_body(desx, encrypted_message, tag, version == LEGACY_WIRE_VERSION)
+
+    return decrypted_message.decode()
+
+def encrypt_envelope(
+    plaintext: str,
+    rabin_public_keys: Sequence[int],
+    rsa_key_pair: RSAKeyPair,
+    key_factory: KeyFactory | None = None
+) -> Envelope:
+    """
+    Шифрует сообщение для нескольких получателей.
+    Тело шифруется DES-X один раз, сеансовый ключ — Рабином для каждого
+    открытого ключа, одна RSA-подпись покрывает весь список ключей.
+    Получатель находит свой ключ по индексу в rabin_public_keys.
+    """
+    if not rabin_public_keys:
+        raise ValueError("Не задано ни одного получателя")
+
+    with metrics.timed("desx.keygen"):
+        desx = _session_manager(key_factory)
+        desx_key = desx.get_key()
+
+    encrypted_message, tag = desx.encrypt_authenticated(plaintext.encode())
+
+    with metrics.timed("rabin.encrypt", {"recipients": str(len(rabin_public_keys))}):
+        encrypted_keys = tuple(encrypt_rabin_many(desx_key, rabin_public_keys, SESSION_KEY_BITS))
+
+    with metrics.timed("rsa.sign"):
+        signature = sign_message(_envelope_signed_data(encrypted_keys, tag), rsa_key_pair)
+
+    return Envelope(
+        encrypted_message=encrypted_message,
+        encrypted_keys=encrypted_keys,
+        signature=signature,
+        tag=tag
+    )
+
+def decrypt_envelope(
+    envelope: Envelope,
+    index: int,
+    rabin_private_key: tuple[int, int, int, int, int] | RabinPrivateKey,
+    rsa_key_pair: RSAKeyPair,
+    allow_legacy: bool = False
+) -> str:
+    """
+    Дешифрует конверт ключом получателя с номером index.
+    Конверты версии 1 без тега принимаются только при allow_legacy=True.
+    """
+    encrypted_message, encrypted_keys, signature, tag, version = envelope
+    _check_version(version, tag, LEGACY_ENVELOPE_VERSION, allow_legacy)
+    if not 0 <= index < len(encrypted_keys):
+        raise IndexError(f"В конверте нет получателя с номером {index}")
+
+    with metrics.timed("rsa.verify"):
+        is_valid = verify_signature(_envelope_signed_data(encrypted_keys, tag, version), signature, rsa_key_pair)
+    if not is_valid:
+        metrics.increment("rsa.verify_failures")
+        raise ValueError("Подпись неверна")
+
+    with metrics.timed("rabin.decrypt"):
+        salted_key = decrypt_rabin(encrypted_keys[index], rabin_private_key)
+    desx_key = salted_key & ((1 << SESSION_KEY_BITS) - 1)
+
+    legacy = version == LEGACY_ENVELOPE_VERSION
+    return _decrypt_body(DESX(desx_key), encrypted_message, tag, legacy).decode()
+
+def encrypt_batch(
+    plaintexts: Sequence[str],
+    rabin_public_key: int,
+    rsa_key_pair: RSAKeyPair
+) -> list[EncryptionResult | Exception]:
+    """
+    Шифрует пакет сообщений под одной парой ключей.
+    Ошибка отдельного сообщения возвращается на его позиции, а не прерывает пакет.
+    """
+    results: list[EncryptionResult | Exception] = []
+    for plaintext in plaintexts:
+        try:
+            results.append(encrypt(plaintext, rabin_public_key, rsa_key_pair))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def decrypt_batch(
+    encryption_results: Sequence[EncryptionResult],
+    rabin_private_key: tuple[int, int, int, int, int] | RabinPrivateKey,
+    rsa_key_pair: RSAKeyPair,
+    cache: LRUCache | None = UNWRAP_CACHE,
+    allow_legacy: bool = False
+) -> list[str | Exception]:
+    """
+    Дешифрует пакет сообщений под одной парой ключей.
+    Подписи сообщений, ключи которых не найдены в кэше, проверяются
+    одним вызовом verify_signatures.
+    Ошибка отдельного сообщения, в том числе контейнер версии 1 без
+    allow_legacy, возвращается на его позиции, а не прерывает пакет.
+    """
+    if not isinstance(rabin_private_key, RabinPrivateKey):
+        rabin_private_key = RabinPrivateKey.from_tuple(rabin_private_key)
+    fingerprint = key_fingerprint(rabin_private_key, rsa_key_pair)
+    rejected: dict[int, Exception] = {}
+    for i, result in enumerate(encryption_results):
+        try:
+            _check_version(result.version, result.tag, LEGACY_WIRE_VERSION, allow_legacy)
+        except ValueError as e:
+            rejected[i] = e
+    cache_keys = [_unwrap_cache_key(result, fingerprint) for result in encryption_results]
+    session_keys = [
+        None if i in rejected else _cached_session_key(cache, key) for i, key in enumerate(cache_keys)
+    ]
+
+    missing = [i for i, desx_key in enumerate(session_keys) if desx_key is None and i not in rejected]
+    valid = dict(zip(missing, verify_signatures(
+        [
+            _signed_data(encryption_results[i].encrypted_key, encryption_results[i].tag, encryption_results[i].version)
+            for i in missing
+        ],
+        [encryption_results[i].signature for i in missing],
+        rsa_key_pair
+    )))
+
+    results: list[str | Exception] = []
+    for i, (result, desx_key) in enumerate(zip(encryption_results, session_keys)):
+        if i in rejected:
+            results.append(rejected[i])
+            continue
+        if not valid.get(i, True):
+            results.append(ValueError("Подпись неверна"))
+            continue
+        try:
+            if desx_key is None:
+                desx_key = rabin_private_key.decrypt(result.encrypted_key)
+                if cache is not None:
+                    cache.put(cache_keys[i], desx_key)
+            legacy = result.version == LEGACY_WIRE_VERSION
+            results.append(_decrypt_body(DESX(desx_key), result.encrypted_message, result.tag, legacy).decode())
+        except Exception as e:
+            results.append(e)
+    return results
+
+# Ключи, установленные в рабочем процессе инициализатором пула
+_worker_keys: tuple = ()
+
+def _init_worker(*keys: object) -> None:
+    global _worker_keys
+    _worker_keys = tuple(
+        RabinPrivateKey.from_tuple(key) if isinstance(key, tuple) else key for key in keys  # type:ignore
+    )
+
+def _encrypt_chunk(plaintexts: list[str]) -> list[EncryptionResult | Exception]:
+    return encrypt_batch(plaintexts, *_worker_keys)
+
+def _decrypt_chunk(encryption_results: list[EncryptionResult], allow_legacy: bool = False) -> list[str | Exception]:
+    return decrypt_batch(encryption_results, *_worker_keys, allow_legacy=allow_legacy)
+
+def _chunked(items: Iterable, chunk_size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _run_pool(
+    items: Iterable,
+    func: Callable[[list], list],
+    keys: tuple,
+    workers: int | None,
+    chunk_size: int,
+    ordered: bool,
+    max_pending: int | None,
+    progress: Callable[[int], None] | None
+) -> Iterator:
+    """
+    Раздаёт элементы пулу процессов порциями по chunk_size.
+    В работе одновременно не более max_pending порций, поэтому входной
+    итератор читается лениво и память ограничена.
+    При ordered=False выдаются пары (номер входного элемента, результат).
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=keys) as pool:
+        chunks = _chunked(items, chunk_size)
+        pending: deque[Future] = deque()
+        # Номер первого элемента каждой порции
+        starts: dict[Future, int] = {}
+        submitted = 0
+        done_count = 0
+
+        def submit_next() -> bool:
+            nonlocal submitted
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            future = pool.submit(func, chunk)
+            pending.append(future)
+            starts[future] = submitted
+            submitted += len(chunk)
+            return True
+
+        while len(pending) < max_pending and submit_next():
+            pass
+
+        while pending:
+            if ordered:
+                future = pending.popleft()
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                future = finished.pop()
+                pending.remove(future)
+            results = future.result()
+            start = starts.pop(future)
+            submit_next()
+            done_count += len(results)
+            if progress is not None:
+                progress(done_count)
+            if ordered:
+                yield from results
+            else:
+                yield from enumerate(results, start)
+
+def encrypt_many(
+    plaintexts: Iterable[str],
+    rabin_public_key: int,
+    rsa_key_pair: RSAKeyPair,
+    workers: int | None = None,
+    chunk_size: int = 256,
+    ordered: bool = True,
+    max_pending: int | None = None,
+    progress: Callable[[int], None] | None = None
+) -> Iterator[EncryptionResult | Exception] | Iterator[tuple[int, EncryptionResult | Exception]]:
+    """
+    Шифрует поток независимых сообщений в пуле процессов.
+    Ключи передаются каждому процессу один раз при его запуске.
+    При ordered=False результаты выдаются по мере готовности порций
+    парами (номер сообщения во входном потоке, результат).
+    Ошибка отдельного сообщения возвращается на его позиции.
+    progress вызывается с числом обработанных сообщений.
+    """
+    return _run_pool(
+        plaintexts, _encrypt_chunk, (rabin_public_key, rsa_key_pair),
+        workers, chunk_size, ordered, max_pending, progress
+    )
+
+def decrypt_many(
+    encryption_results: Iterable[EncryptionResult],
+    rabin_private_key: tuple[int, int, int, int, int] | RabinPrivateKey,
+    rsa_key_pair: RSAKeyPair,
+    workers: int | None = None,
+    chunk_size: int = 256,
+    ordered: bool = True,
+    max_pending: int | None = None,
+    progress: Callable[[int], None] | None = None,
+    allow_legacy: bool = False
+) -> Iterator[str | Exception] | Iterator[tuple[int, str | Exception]]:
+    """Дешифрует поток сообщений в пуле процессов, аналогично encrypt_many."""
+    # memoryview нельзя передать в другой процесс
+    results = (
+        result._replace(encrypted_message=bytes(result.encrypted_message))
+        if isinstance(result.encrypted_message, memoryview) else result
+        for result in encryption_results
+    )
+    return _run_pool(
+        results, partial(_decrypt_chunk, allow_legacy=allow_legacy), (rabin_private_key, rsa_key_pair),
+        workers, chunk_size, ordered, max_pending, progress
+    )
 
-    return decrypted_message
+def _write_int(sink: BinaryIO, value: int) -> None:
+    """Записывает целое число с 2-байтовым префиксом длины"""
+    data = value.to_bytes((value.bit_length() + 7) // 8 or 1, 'big')
+    sink.write(struct.pack('>H', len(data)))
+    sink.write(data)
+
+def _read_int(source: BinaryIO) -> int:
+    """Читает целое число, записанное _write_int"""
+    header = source.read(2)
+    if len(header) != 2:
+        raise ValueError("Поток обрезан: заголовок неполон")
+    (length,) = struct.unpack('>H', header)
+    data = source.read(length)
+    if len(data) != length:
+        raise ValueError("Поток обрезан: заголовок неполон")
+    return int.from_bytes(data, 'big')
+
+# Подписи потока в отдельной области: они не совпадают ни с подписью
+# контейнера (ключ и тег), ни с подписью контейнера версии 1 (только ключ)
+STREAM_DOMAIN = "stream"
+STREAM_TAG_SIZE = hashlib.sha256().digest_size
+
+def _stream_header_signed_data(encrypted_key: int) -> str:
+    """Данные подписи заголовка потока: зашифрованный ключ"""
+    return f"{STREAM_DOMAIN}:{encrypted_key}"
+
+def _stream_signed_data(encrypted_key: int, tag: bytes) -> str:
+    """Данные подписи завершения потока: зашифрованный ключ и тег шифротекста"""
+    return f"{STREAM_DOMAIN}:{encrypted_key}:{tag.hex()}"
+
+class _HashingSink:
+    """Обёртка приёмника, хэширующая записанный шифротекст"""
+
+    def __init__(self, sink: BinaryIO, hasher: "hashlib._Hash"):
+        self.sink = sink
+        self.hasher = hasher
+
+    def write(self, data: bytes) -> int:
+        self.hasher.update(data)
+        return self.sink.write(data)
+
+def _split_trailer(
+    source: BinaryIO,
+    trailer_size: int,
+    hasher: "hashlib._Hash",
+    trailer: bytearray
+) -> Iterator[bytes]:
+    """
+    Выдаёт шифротекст потока, удерживая последние trailer_size байт:
+    по окончании источника они записываются в trailer.
+    Выданные байты хэшируются.
+    """
+    pending = b''
+    while chunk := source.read(STREAM_CHUNK_SIZE):
+        pending += chunk
+        if len(pending) > trailer_size:
+            body = pending[:-trailer_size]
+            pending = pending[-trailer_size:]
+            hasher.update(body)
+            yield body
+    if len(pending) != trailer_size:
+        raise ValueError("Поток обрезан: нет завершения")
+    trailer[:] = pending
+
+def encrypt_stream(
+    source: BinaryIO | Iterable[bytes],
+    sink: BinaryIO,
+    rabin_public_key: int,
+    rsa_key_pair: RSAKeyPair
+) -> int:
+    """
+    Потоковое гибридное шифрование с постоянным расходом памяти.
+    В начало потока записывается заголовок: ключ DES-X, зашифрованный
+    Рабином, и RSA-подпись заголовка; далее идёт шифротекст DES-X.
+    Шифротекст хэшируется SHA-256 в том же проходе, и поток завершается
+    тегом и подписью ключа вместе с тегом (ширина подписи — длина модуля RSA).
+    Возвращает количество байт шифротекста.
+    """
+    desx = _session_manager()
+    desx_key = desx.get_key()
+
+    encrypted_desx_key = encrypt_rabin(desx_key, rabin_public_key)
+    signature = sign_message(_stream_header_signed_data(encrypted_desx_key), rsa_key_pair)
+
+    _write_int(sink, encrypted_desx_key)
+    _write_int(sink, signature.signature)
+    hasher = hashlib.sha256()
+    written = desx.encrypt_stream(source, _HashingSink(sink, hasher))  # type:ignore
+
+    tag = hasher.digest()
+    trailer_signature = sign_message(_stream_signed_data(encrypted_desx_key, tag), rsa_key_pair)
+    sink.write(tag)
+    sink.write(trailer_signature.signature.to_bytes(_byte_length(rsa_key_pair.n), 'big'))
+    return written
+
+def decrypt_stream(
+    source: BinaryIO,
+    sink: BinaryIO,
+    rabin_private_key: tuple[int, int, int, int, int] | RabinPrivateKey,
+    rsa_key_pair: RSAKeyPair
+) -> int:
+    """
+    Потоковое гибридное дешифрование потока, созданного encrypt_stream.
+    Открытый текст записывается в sink по мере дешифрования, а тег
+    проверяется по завершении потока: при ValueError записанное
+    в sink нужно отбросить.
+    Возвращает количество байт открытого текста.
+    """
+    encrypted_desx_key = _read_int(source)
+    signature = RSASignature(_read_int(source))
+
+    if not verify_signature(_stream_header_signed_data(encrypted_desx_key), signature, rsa_key_pair):
+        raise ValueError("Подпись неверна")
+
+    desx_key = decrypt_rabin(encrypted_desx_key, rabin_private_key)
+    hasher = hashlib.sha256()
+    trailer = bytearray()
+    written = DESX(desx_key).decrypt_stream(
+        _split_trailer(source, STREAM_TAG_SIZE + _byte_length(rsa_key_pair.n), hasher, trailer), sink
+    )
+
+    tag = bytes(trailer[:STREAM_TAG_SIZE])
+    trailer_signature = RSASignature(int.from_bytes(trailer[STREAM_TAG_SIZE:], 'big'))
+    if not hmac.compare_digest(hasher.digest(), tag):
+        metrics.increment("desx.tag_failures")
+        raise ValueError("Тег целостности не совпадает")
+    if not verify_signature(_stream_signed_data(encrypted_desx_key, tag), trailer_signature, rsa_key_pair):
+        raise ValueError("Подпись неверна")
+    return written
 
 if __name__ == "__main__":
-    rabin_private, rabin_public = generate_rabin_keys()
-    rsa_key_pair = generate_rsa_keys(1024)
+    # Путь к хранилищу ключей: ключи генерируются только при первом запуске
+    keystore_path = os.environ.get("DESX_KEYSTORE")
+    if keystore_path:
+        from keystore import load_or_generate
+        rabin_private, rsa_key_pair = load_or_generate(keystore_path)
+        rabin_public = rabin_private.n
+    else:
+        rabin_private, rabin_public = generate_rabin_keys()
+        rsa_key_pair = generate_rsa_keys(1024)
 
     plaintext = "Test message"
 
@@ -0,0 +1,158 @@
+import threading
+import time
+from typing import Callable
+
+# Флаг проверяется на горячих путях до любой другой работы,
+# поэтому выключенная инструментация почти ничего не стоит
+ENABLED = False
+
+_sinks: list["MetricsSink"] = []
+
+Labels = dict[str, str] | None
+
+class MetricsSink:
+    """Приёмник метрик: замеры времени этапов и счётчики"""
+
+    def observe(self, name: str, seconds: float, labels: Labels = None) -> None:
+        pass
+
+    def increment(self, name: str, value: int = 1, labels: Labels = None) -> None:
+        pass
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин, как в Prometheus"""
+
+    BUCKETS = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "buckets": dict(zip([*map(str, self.BUCKETS), "+Inf"], self.counts))
+        }
+
+def _key(name: str, labels: Labels) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+class InMemorySink(MetricsSink):
+    """Хранит гистограммы времени и счётчики в памяти процесса"""
+
+    def __init__(self):
+        self.histograms: dict[str, Histogram] = {}
+        self.counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, labels: Labels = None) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name: str, value: int = 1, labels: Labels = None) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def snapshot(self) -> dict:
+        """Копия текущих значений всех метрик"""
+        with self._lock:
+            return {
+                "timings": {key: h.as_dict() for key, h in self.histograms.items()},
+                "counters": dict(self.counters)
+            }
+
+class CallbackSink(MetricsSink):
+    """Передаёт метрики во внешние обработчики, например в экспортёр Prometheus"""
+
+    def __init__(
+        self,
+        on_observe: Callable[[str, float, Labels], None] | None = None,
+        on_increment: Callable[[str, int, Labels], None] | None = None
+    ):
+        self.on_observe = on_observe
+        self.on_increment = on_increment
+
+    def observe(self, name: str, seconds: float, labels: Labels = None) -> None:
+        if self.on_observe is not None:
+            self.on_observe(name, seconds, labels)
+
+    def increment(self, name: str, value: int = 1, labels: Labels = None) -> None:
+        if self.on_increment is not None:
+            self.on_increment(name, value, labels)
+
+def enable(*sinks: MetricsSink) -> None:
+    """Включает инструментацию и добавляет приёмники"""
+    global ENABLED
+    _sinks.extend(sinks)
+    ENABLED = True
+
+def disable() -> None:
+    """Выключает инструментацию и удаляет все приёмники"""
+    global ENABLED
+    ENABLED = False
+    _sinks.clear()
+
+def increment(name: str, value: int = 1, labels: Labels = None) -> None:
+    """Увеличивает счётчик во всех приёмниках"""
+    if not ENABLED:
+        return
+    for sink in _sinks:
+        sink.increment(name, value, labels)
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name: str, labels: Labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        elapsed = time.perf_counter() - self.start
+        for sink in _sinks:
+            sink.observe(self.name, elapsed, self.labels)
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+def timed(name: str, labels: Labels = None) -> _Timer | _NullTimer:
+    """Контекстный менеджер замера времени этапа; при выключенной инструментации — пустышка"""
+    if not ENABLED:
+        return _NULL_TIMER
+    return _Timer(name, labels)
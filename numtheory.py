@@ -0,0 +1,142 @@
+import math
+import random
+
+SMALL_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+# Для n < 3 317 044 064 679 887 385 961 981 тест Миллера-Рабина по основаниям
+# SMALL_PRIMES + (41,) детерминирован
+_DETERMINISTIC_LIMIT = 3317044064679887385961981
+_DETERMINISTIC_BASES = SMALL_PRIMES + (41,)
+
+# Случайные основания берутся из ОС, поэтому рабочие процессы пула,
+# унаследовавшие состояние random, не повторяют одни и те же основания
+_RANDOM = random.SystemRandom()
+
+def extended_gcd(a: int, b: int) -> tuple[int, int, int]:
+    """
+    Итеративный расширенный алгоритм Евклида.
+    Возвращает (g, x, y), где g = gcd(a, b) и a*x + b*y = g.
+    """
+    old_r, r = a, b
+    old_x, x = 1, 0
+    old_y, y = 0, 1
+    while r:
+        q = old_r // r
+        old_r, r = r, old_r - q * r
+        old_x, x = x, old_x - q * x
+        old_y, y = y, old_y - q * y
+    return old_r, old_x, old_y
+
+def mod_inverse(a: int, m: int) -> int | None:
+    """Обратный элемент a по модулю m или None, если он не существует."""
+    try:
+        return pow(a, -1, m)
+    except ValueError:
+        return None
+
+def _strong_probable_prime(n: int, base: int, d: int, s: int) -> bool:
+    """Проверка n как сильного вероятно простого по основанию base; n - 1 = d * 2^s."""
+    x = pow(base, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
+
+def _decompose(n: int) -> tuple[int, int]:
+    """Представляет n - 1 в виде d * 2^s."""
+    d = n - 1
+    s = (d & -d).bit_length() - 1
+    return d >> s, s
+
+def miller_rabin(n: int, bases: tuple[int, ...] | list[int]) -> bool:
+    """Тест Миллера-Рабина для нечётного n > 3 по заданным основаниям."""
+    d, s = _decompose(n)
+    return all(_strong_probable_prime(n, base % n, d, s) for base in bases if base % n)
+
+def jacobi(a: int, n: int) -> int:
+    """Символ Якоби (a/n) для нечётного n > 0."""
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+def _half_mod(x: int, n: int) -> int:
+    """x / 2 по нечётному модулю n."""
+    x %= n
+    if x & 1:
+        x += n
+    return x >> 1
+
+def strong_lucas(n: int) -> bool:
+    """Сильный тест Люка с параметрами Селфриджа для нечётного n > 2, не являющегося квадратом."""
+    d_param = 5
+    while True:
+        j = jacobi(d_param, n)
+        if j == -1:
+            break
+        if j == 0 and abs(d_param) != n:
+            return False
+        d_param = -d_param - 2 if d_param > 0 else -d_param + 2
+    p, q = 1, (1 - d_param) // 4
+
+    d = n + 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+
+    u, v, q_k = 1, p, q % n
+    for bit in bin(d)[3:]:
+        u = u * v % n
+        v = (v * v - 2 * q_k) % n
+        q_k = q_k * q_k % n
+        if bit == '1':
+            u, v = _half_mod(p * u + v, n), _half_mod(d_param * u + p * v, n)
+            q_k = q_k * q % n
+
+    if u == 0 or v == 0:
+        return True
+    for _ in range(s - 1):
+        v = (v * v - 2 * q_k) % n
+        if v == 0:
+            return True
+        q_k = q_k * q_k % n
+    return False
+
+def baillie_psw(n: int) -> bool:
+    """Тест Бейли-PSW: сильный тест по основанию 2 и сильный тест Люка."""
+    if not miller_rabin(n, (2,)):
+        return False
+    root = math.isqrt(n)
+    if root * root == n:
+        return False
+    return strong_lucas(n)
+
+def is_prime(n: int, rounds: int = 0, k: int | None = None) -> bool:
+    """
+    Проверка числа на простоту.
+    Малые n проверяются детерминированным тестом Миллера-Рабина,
+    большие — тестом Бейли-PSW; rounds добавляет случайные раунды Миллера-Рабина.
+    k — прежнее имя rounds у rsa.is_prime и rabin.is_prime, оставлено для совместимости.
+    """
+    if k is not None:
+        rounds = k
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    if n < _DETERMINISTIC_LIMIT:
+        return miller_rabin(n, _DETERMINISTIC_BASES)
+    if not baillie_psw(n):
+        return False
+    return rounds <= 0 or miller_rabin(n, [_RANDOM.randint(2, n - 2) for _ in range(rounds)])
@@ -0,0 +1,98 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+from numtheory import is_prime
+
+def _small_primes(limit: int) -> list[int]:
+    """Решето Эратосфена: все простые числа меньше limit"""
+    sieve = bytearray([1]) * limit
+    sieve[0:2] = b'\x00\x00'
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i in range(limit) if sieve[i]]
+
+# Таблица малых простых для просеивания кандидатов (кроме 2)
+SMALL_PRIMES = _small_primes(2000)[1:]
+
+# Источник случайности ОС: начала окон определяют секретные простые числа,
+# а глобальный генератор random не должен ни влиять на них, ни зависеть от них
+_RANDOM = random.SystemRandom()
+
+def _search_window(task: tuple[int, int, int, int, int]) -> tuple[int | None, int]:
+    """
+    Ищет простое число в окне кандидатов start + k * modulus, k < window.
+    Кандидаты, делящиеся на малые простые, отсеиваются решетом
+    до запуска теста Миллера-Рабина.
+    Возвращает найденное число (или None) и количество проверенных кандидатов.
+    """
+    bits, start, modulus, window, rounds = task
+
+    sieve = bytearray([1]) * window
+    for sp in SMALL_PRIMES:
+        if modulus % sp == 0:
+            continue
+        # Индекс первого k, при котором start + k * modulus делится на sp
+        first = (-start * pow(modulus, -1, sp)) % sp
+        sieve[first::sp] = bytes(len(range(first, window, sp)))
+
+    tested = 0
+    for k in range(window):
+        if not sieve[k]:
+            continue
+        candidate = start + k * modulus
+        if candidate.bit_length() != bits:
+            return None, tested
+        tested += 1
+        if is_prime(candidate, rounds):
+            return candidate, tested
+    return None, tested
+
+def generate_prime(
+    bits: int,
+    residue: int = 1,
+    modulus: int = 2,
+    rounds: int = 0,
+    workers: int = 1
+) -> int:
+    """
+    Генерация простого числа заданной битности с условием p ≡ residue mod modulus.
+    Параметры:
+        bits: Длина числа в битах.
+        residue, modulus: Ограничение на вычет (например, 3 и 4 для Рабина);
+            modulus должен быть степенью двойки, residue — нечётным.
+        rounds: Дополнительные случайные раунды Миллера-Рабина после Бейли-PSW.
+        workers: Число процессов для параллельной проверки окон.
+    Возвращает:
+        Простое число p.
+    """
+    window = max(64, 4 * bits)
+
+    def next_task() -> tuple[int, int, int, int, int]:
+        start = _RANDOM.getrandbits(bits) | (1 << (bits - 1))
+        start += (residue - start) % modulus
+        return bits, start, modulus, window, rounds
+
+    with metrics.timed("primes.generate", {"bits": str(bits)}):
+        if workers <= 1:
+            while True:
+                prime, tested = _search_window(next_task())
+                _count_attempts(bits, 1, tested)
+                if prime is not None:
+                    return prime
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                results = list(pool.map(_search_window, [next_task() for _ in range(workers)]))
+                _count_attempts(bits, len(results), sum(tested for _, tested in results))
+                for prime, _ in results:
+                    if prime is not None:
+                        return prime
+
+def _count_attempts(bits: int, windows: int, tested: int) -> None:
+    """Учитывает просмотренные окна и кандидатов, прошедших решето"""
+    if metrics.ENABLED:
+        labels = {"bits": str(bits)}
+        metrics.increment("primes.windows", windows, labels)
+        metrics.increment("primes.candidates", tested, labels)
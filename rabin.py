@@ -1,86 +1,88 @@
-import random
+import secrets
+from typing import Iterable
 
-def is_prime(n: int, k: int = 20) -> bool:
-    """
-    Проверка простоты числа с использованием теста Миллера-Рабина.
-    Параметры:
-        n: Число для проверки.
-        k: Количество раундов тестирования.
-    Возвращает:
-        True, если число вероятно простое, иначе False.
-    """
-    if n < 2:
-        return False
-    if n == 2 or n == 3:
-        return True
-    if n % 2 == 0:
-        return False
-
-    # Представим n-1 в виде (2^s * d)
-    s = 0
-    d = n - 1
-    while d % 2 == 0:
-        s += 1
-        d //= 2
-
-    # Проведем k раундов теста
-    for _ in range(k):
-        a = random.randint(2, n - 2)
-        x = pow(a, d, n)
-        if x == 1 or x == n - 1:
-            continue
-
-        for __ in range(s - 1):
-            x = pow(x, 2, n)
-            if x == n - 1:
-                break
-        else:
-            return False
-
-    return True
-
-def generate_prime(bit_length: int) -> int:
+import primes
+from numtheory import extended_gcd, is_prime
+
+LABEL = 0b1010101010101010  # Фиксированный битовый шаблон метки
+
+def generate_prime(bit_length: int, workers: int = 1) -> int:
     """
     Генерация простого числа заданной длины с условием p ≡ 3 mod 4.
+    Условие встроено в построение кандидатов, см. primes.generate_prime.
     Параметры:
         bit_length: Длина числа в битах.
+        workers: Число процессов для проверки кандидатов.
     Возвращает:
         Простое число p.
     """
-    while True:
-        p = random.getrandbits(bit_length)
-        p |= (1 << bit_length - 1) | 1  # Установка старшего и младшего бита
-        if p % 4 == 3 and is_prime(p):
-            return p
+    return primes.generate_prime(bit_length, residue=3, modulus=4, workers=workers)
 
-def extended_gcd(a: int, b: int) -> tuple[int, int, int]:
+class RabinPrivateKey:
     """
-    Расширенный алгоритм Евклида.
-    Параметры:
-        a, b: Входные числа.
-    Возвращает:
-        (g, x, y): gcd(a, b), коэффициенты Безу (x, y).
+    Закрытый ключ Рабина с заранее вычисленными константами:
+    показатели степени для корней по p и q и коэффициенты КТО a*p и b*q.
     """
-    if b == 0:
-        return a, 1, 0
-    g, x1, y1 = extended_gcd(b, a % b)
-    g, x, y = g, y1, x1 - (a // b) * y1
-    return g, x, y
-
-def generate_keys(bit_length: int = 512) -> tuple[tuple[int, int, int, int, int], int]:
+    __slots__ = ('p', 'q', 'a', 'b', 'n', 'exp_p', 'exp_q', 'coef_p', 'coef_q')
+
+    def __init__(self, p: int, q: int, a: int, b: int, n: int):
+        self.p = p
+        self.q = q
+        self.a = a
+        self.b = b
+        self.n = n
+        self.exp_p = (p + 1) // 4
+        self.exp_q = (q + 1) // 4
+        self.coef_p = (a * p) % n
+        self.coef_q = (b * q) % n
+
+    @classmethod
+    def from_tuple(cls, private_key: tuple[int, int, int, int, int]) -> "RabinPrivateKey":
+        return cls(*private_key)
+
+    def as_tuple(self) -> tuple[int, int, int, int, int]:
+        return self.p, self.q, self.a, self.b, self.n
+
+    def decrypt(self, c: int) -> int:
+        """Дешифрует один шифротекст"""
+        n = self.n
+        r = pow(c, self.exp_p, self.p)
+        s = pow(c, self.exp_q, self.q)
+        ps = self.coef_p * s
+        qr = self.coef_q * r
+        x1 = (ps + qr) % n
+        x3 = (ps - qr) % n
+
+        found = None
+        for candidate in (x1, n - x1, x3, n - x3):
+            if candidate & 0xFFFF == LABEL:
+                if found is not None:
+                    raise ValueError(f"Обнаружено несколько сообщений с верной меткой: {[found, candidate >> 16]}")
+                found = candidate >> 16
+        if found is None:
+            raise ValueError("Не найдено ни одного сообщения с правильной меткой")
+        return found
+
+    def decrypt_many(self, ciphertexts: Iterable[int]) -> list[int]:
+        """Дешифрует пакет шифротекстов (например, сеансовых ключей) за один вызов"""
+        decrypt = self.decrypt
+        return [decrypt(c) for c in ciphertexts]
+
+def generate_keys(bit_length: int = 512, workers: int = 1) -> tuple[tuple[int, int, int, int, int], int]:
     """
     Генерация ключей для алгоритма Рабина.
     Параметры:
         bit_length: Длина модуля n в битах.
+        workers: Число процессов для поиска простых чисел.
     Возвращает:
         private_key: Закрытый ключ (p, q, a, b, n)
         public_key: Открытый ключ (n)
     """
     half_len = bit_length // 2
-    p = generate_prime(half_len)
-    q = generate_prime(half_len)
+    p = generate_prime(half_len, workers)
+    q = generate_prime(half_len, workers)
     while p == q:
-        q = generate_prime(half_len)
+        q = generate_prime(half_len, workers)
 
     n = p * q
     _, a, b = extended_gcd(p, q)
@@ -88,12 +90,10 @@ def generate_keys(bit_length: int = 512) -> tuple[tuple[int, int, int, int, int]
 
 def add_label(m: int) -> int:
     """Добавляет 16-битную метку к сообщению (старшие 16 бит)"""
-    LABEL = 0b1010101010101010  # Фиксированный битовый шаблон AAaa в шестнадцатеричном виде
     return (m << 16) | LABEL
 
 def remove_label(m_labeled: int) -> int | None:
     """Проверяет и удаляет метку, возвращает None если метка неверна"""
-    LABEL = 0b1010101010101010
     label_part = m_labeled & 0xFFFF  # Младшие 16 бит
     original_m = m_labeled >> 16
     
@@ -115,15 +115,45 @@ def encrypt(m: int, n: int) -> int:
         raise ValueError("Сообщение слишком большое после добавления метки")
     return pow(m_labeled, 2, n)
 
-def decrypt(c: int, private_key: tuple[int, int, int, int, int]) -> int:
+def encrypt_many(m: int, public_keys: Iterable[int], salt_shift: int | None = None) -> list[int]:
+    """
+    Шифрование одного сообщения для нескольких открытых ключей.
+    При заданном salt_shift каждому получателю выше бита salt_shift
+    добавляются свои случайные биты: без них одинаковые квадраты по разным
+    модулям позволяют восстановить сообщение по КТО. Получатель отбрасывает
+    соль маской (1 << salt_shift) - 1.
+    Параметры:
+        m: Исходное сообщение (число).
+        public_keys: Открытые ключи получателей.
+        salt_shift: Позиция младшего бита соли или None без соли.
+    Возвращает:
+        Шифротексты в порядке public_keys.
+    """
+    results = []
+    for n in public_keys:
+        value = m
+        if salt_shift is not None:
+            # Сообщение с солью и меткой должно оставаться меньше n
+            salt_bits = n.bit_length() - 17 - salt_shift
+            if salt_bits <= 0:
+                raise ValueError("Модуль слишком мал для сообщения с солью")
+            # Соль — единственная защита от восстановления ключа по шифротекстам
+            # разных получателей, поэтому она берётся из источника случайности ОС
+            value |= secrets.randbits(salt_bits) << salt_shift
+        results.append(encrypt(value, n))
+    return results
+
+def decrypt(c: int, private_key: "tuple[int, int, int, int, int] | RabinPrivateKey") -> int:
     """
     Дешифрование сообщения с помощью закрытого ключа.
     Параметры:
         c: Шифротекст.
-        private_key: Закрытый ключ (p, q, a, b, n).
+        private_key: Закрытый ключ (p, q, a, b, n) или RabinPrivateKey.
     Возвращает:
         Расшифрованное сообщение
     """
+    if isinstance(private_key, RabinPrivateKey):
+        return private_key.decrypt(c)
     p, q, a, b, n = private_key
     # Вычисляем квадратные корни по модулям p и q
     r = pow(c, (p + 1) // 4, p)
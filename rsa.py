@@ -1,11 +1,35 @@
+import hashlib
 import random
-from typing import Tuple, Optional
+import time
+from typing import BinaryIO, Iterable, Sequence
+
+import primes
+from numtheory import extended_gcd, is_prime, mod_inverse
+
+HASH_CHUNK_SIZE = 1 << 16  # Размер чанка при хэшировании файлоподобных объектов
+
+# Подписываемые данные: строка, байты, поток или итератор чанков
+Message = str | bytes | bytearray | memoryview | BinaryIO | Iterable[bytes]
 
 class RSAKeyPair:
-    def __init__(self, n: int, e: int, d: int):
+    def __init__(self, n: int, e: int, d: int, p: int | None = None, q: int | None = None):
         self.n = n
         self.public_key = e
         self.private_key = d
+        # Параметры для подписи по китайской теореме об остатках (CRT)
+        self.p = p
+        self.q = q
+        if p is not None and q is not None:
+            self.d_p = d % (p - 1)
+            self.d_q = d % (q - 1)
+            self.q_inv = mod_inverse(q, p)
+        else:
+            self.d_p = self.d_q = self.q_inv = None
+
+    @property
+    def has_crt(self) -> bool:
+        """Доступны ли параметры CRT для ускоренной подписи"""
+        return self.q_inv is not None
 
 class RSASignature:
     def __init__(self, signature: int):
@@ -14,64 +38,43 @@ class RSASignature:
     def __repr__(self) -> str:
         return f"RSA Signature: {self.signature}"
 
-def is_prime(n: int, k: int = 5) -> bool:
-    """Проверка числа на простоту с использованием теста Миллера-Рабина."""
-    if n <= 1:
-        return False
-    for p in [2, 3, 5, 7, 11, 13, 17, 19, 23, 29]:
-        if n % p == 0:
-            return n == p
-    d = n - 1
-    s = 0
-    while d % 2 == 0:
-        d //= 2
-        s += 1
-    for _ in range(k):
-        a = random.randint(2, n-2)
-        x = pow(a, d, n)
-        if x == 1 or x == n-1:
-            continue
-        for __ in range(s-1):
-            x = pow(x, 2, n)
-            if x == n-1:
-                break
-        else:
-            return False
-    return True
-
-def generate_prime(bits: int) -> int:
+def generate_prime(bits: int, workers: int = 1) -> int:
     """Генерация простого числа заданной битности."""
-    while True:
-        num = random.getrandbits(bits) | (1 << (bits-1)) | 1
-        if is_prime(num):
-            return num
-
-def mod_inverse(a: int, m: int) -> Optional[int]:
-    """Нахождение обратного элемента по модулю m."""
-    g, x, y = extended_gcd(a, m)
-    if g != 1:
-        return None
-    return x % m
-
-def extended_gcd(a: int, b: int) -> Tuple[int, int, int]:
-    """Расширенный алгоритм Евклида."""
-    if a == 0:
-        return (b, 0, 1)
+    return primes.generate_prime(bits, workers=workers)
+
+def hash_message(message: Message) -> int:
+    """
+    SHA-256 сообщения как целое число.
+    Принимает строку (кодируется в UTF-8), байтовый буфер, файлоподобный объект,
+    итератор чанков или объект hashlib, уже накопивший данные через update().
+    Большие данные хэшируются по частям без копирования в одну строку.
+    """
+    if hasattr(message, 'digest') and hasattr(message, 'update'):
+        return int.from_bytes(message.digest(), 'big')  # type:ignore
+    hasher = hashlib.sha256()
+    if isinstance(message, str):
+        hasher.update(message.encode())
+    elif isinstance(message, (bytes, bytearray, memoryview)):
+        hasher.update(message)
+    elif hasattr(message, 'read'):
+        while chunk := message.read(HASH_CHUNK_SIZE):  # type:ignore
+            hasher.update(chunk)
     else:
-        g, y, x = extended_gcd(b % a, a)
-        return (g, x - (b // a) * y, y)
+        for chunk in message:  # type:ignore
+            hasher.update(chunk)
+    return int.from_bytes(hasher.digest(), 'big')
 
 def simple_hash(message: str) -> int:
-    """Упрощенная хэш-функция (для демонстрации)."""
+    """Упрощенная хэш-функция (для демонстрации, подписи используют hash_message)."""
     return sum(ord(c) for c in message) % (2**32)
 
-def generate_rsa_keys(bit_length: int = 1024) -> RSAKeyPair:
+def generate_rsa_keys(bit_length: int = 1024, workers: int = 1) -> RSAKeyPair:
     """Генерация пары ключей для RSA."""
     # Генерация двух различных простых чисел
-    p = generate_prime(bit_length // 2)
-    q = generate_prime(bit_length // 2)
+    p = generate_prime(bit_length // 2, workers)
+    q = generate_prime(bit_length // 2, workers)
     while p == q:
-        q = generate_prime(bit_length // 2)
+        q = generate_prime(bit_length // 2, workers)
     
     n = p * q
     phi = (p - 1) * (q - 1)
@@ -94,21 +97,37 @@ def generate_rsa_keys(bit_length: int = 1024) -> RSAKeyPair:
     if d is None:
         raise ValueError("Не удалось найти обратный элемент для e по модулю phi(n)")
     
-    return RSAKeyPair(n, e, d)
+    return RSAKeyPair(n, e, d, p, q)
 
-def sign_message(message: str, key_pair: RSAKeyPair) -> RSASignature:
-    """Подпись сообщения по алгоритму RSA."""
-    h = simple_hash(message)
+def _sign_crt(h: int, key_pair: RSAKeyPair) -> int:
+    """Возведение в степень d через две полуразмерные экспоненты и рекомбинацию Гарнера."""
+    p, q = key_pair.p, key_pair.q
+    s_p = pow(h % p, key_pair.d_p, p)  # type:ignore
+    s_q = pow(h % q, key_pair.d_q, q)  # type:ignore
+    return s_q + q * ((key_pair.q_inv * (s_p - s_q)) % p)  # type:ignore
+
+def sign_message(message: Message, key_pair: RSAKeyPair, fault_check: bool = False) -> RSASignature:
+    """
+    Подпись сообщения по алгоритму RSA.
+    При наличии p и q используется CRT; fault_check включает проверку
+    подписи открытым ключом для защиты от сбоев при вычислении.
+    """
+    h = hash_message(message)
     # Проверка на слишком большое хэш-значение
     if h >= key_pair.n:
         h = h % key_pair.n
     
-    signature = pow(h, key_pair.private_key, key_pair.n)
+    if key_pair.has_crt:
+        signature = _sign_crt(h, key_pair)
+        if fault_check and pow(signature, key_pair.public_key, key_pair.n) != h:
+            raise ValueError("Ошибка вычисления подписи: проверка CRT не пройдена")
+    else:
+        signature = pow(h, key_pair.private_key, key_pair.n)
     return RSASignature(signature)
 
-def verify_signature(message: str, signature: RSASignature, key_pair: RSAKeyPair) -> bool:
+def verify_signature(message: Message, signature: RSASignature, key_pair: RSAKeyPair) -> bool:
     """Проверка подписи RSA."""
-    h = simple_hash(message)
+    h = hash_message(message)
     # Проверка на слишком большое хэш-значение
     if h >= key_pair.n:
         h = h % key_pair.n
@@ -116,6 +135,87 @@ def verify_signature(message: str, signature: RSASignature, key_pair: RSAKeyPair
     decrypted_hash = pow(signature.signature, key_pair.public_key, key_pair.n)
     return h == decrypted_hash
 
+# Длина случайных экспонент теста малых экспонент в verify_signatures
+SCREENING_BITS = 64
+_SCREENING_RANDOM = random.SystemRandom()
+
+def verify_signatures(
+    messages: Sequence[Message],
+    signatures: Sequence[RSASignature],
+    key_pair: RSAKeyPair,
+    screening: bool = False
+) -> list[bool]:
+    """
+    Пакетная проверка подписей RSA под одной парой ключей.
+    При screening=True сначала выполняется тест малых экспонент: подписи и
+    хэши возводятся в случайные SCREENING_BITS-битные степени r_i и
+    сравниваются произведения (prod s_i^r_i)^e и prod h_i^r_i. Взаимно
+    компенсирующие подписи вида (s1*x, s2/x) проходят его лишь с вероятностью
+    порядка 2^-SCREENING_BITS. Только при неудаче выполняется поэлементная проверка.
+    Тест стоит двух SCREENING_BITS-битных возведений в степень на подпись
+    и выгоден, только если открытая экспонента длиннее SCREENING_BITS бит.
+    Иначе (в том числе при e = 65537 у ключей generate_rsa_keys) screening
+    игнорируется и подписи проверяются напрямую.
+    Возвращает список результатов для каждой пары (сообщение, подпись).
+    """
+    if len(messages) != len(signatures):
+        raise ValueError("Количество сообщений и подписей не совпадает")
+    n, e = key_pair.n, key_pair.public_key
+
+    hash_cache: dict[str | bytes, int] = {}
+    hashes = []
+    for message in messages:
+        if not isinstance(message, (str, bytes)):
+            hashes.append(hash_message(message) % n)
+            continue
+        h = hash_cache.get(message)
+        if h is None:
+            h = hash_cache[message] = hash_message(message) % n
+        hashes.append(h)
+    values = [signature.signature for signature in signatures]
+
+    if screening and e.bit_length() > SCREENING_BITS and values and all(0 < s < n for s in values):
+        signature_product = hash_product = 1
+        for s, h in zip(values, hashes):
+            r = _SCREENING_RANDOM.getrandbits(SCREENING_BITS) | 1
+            signature_product = signature_product * pow(s, r, n) % n
+            hash_product = hash_product * pow(h, r, n) % n
+        if pow(signature_product, e, n) == hash_product:
+            return [True] * len(values)
+
+    return [pow(s, e, n) == h for s, h in zip(values, hashes)]
+
+def benchmark_verification(count: int = 1000, bit_length: int = 1024) -> dict[str, float]:
+    """
+    Сравнивает время проверки count подписей циклом verify_signature
+    и пакетной функцией verify_signatures (со скринингом и без).
+    При e = 65537 скрининг не применяется, и его время совпадает с batch;
+    флаг screening_applied показывает, выполнялся ли тест малых экспонент.
+    """
+    key_pair = generate_rsa_keys(bit_length)
+    messages = [f"message {i}" for i in range(count)]
+    signatures = [sign_message(message, key_pair) for message in messages]
+
+    start = time.perf_counter()
+    loop = [verify_signature(m, s, key_pair) for m, s in zip(messages, signatures)]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = verify_signatures(messages, signatures, key_pair)
+    batch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    screened = verify_signatures(messages, signatures, key_pair, screening=True)
+    screening_time = time.perf_counter() - start
+
+    assert loop == batch == screened
+    return {
+        "loop": loop_time,
+        "batch": batch_time,
+        "screening": screening_time,
+        "screening_applied": float(key_pair.public_key.bit_length() > SCREENING_BITS)
+    }
+
 # Пример использования
 if __name__ == "__main__":
     # Генерация ключей
@@ -136,4 +236,14 @@ if __name__ == "__main__":
     # Проверка с измененной подписью
     tampered_signature = RSASignature(signature.signature + 1)
     is_valid_tampered = verify_signature(message, tampered_signature, key_pair)
-    print(f"Подпись с измененной подписью {'верна' if is_valid_tampered else 'неверна'}!")
\ No newline at end of file
+    print(f"Подпись с измененной подписью {'верна' if is_valid_tampered else 'неверна'}!")
+
+    # Сравнение пакетной проверки с поэлементной
+    timings = benchmark_verification()
+    print(f"Цикл verify_signature: {timings['loop']:.3f} с")
+    print(f"verify_signatures: {timings['batch']:.3f} с")
+    if timings["screening_applied"]:
+        print(f"verify_signatures со скринингом: {timings['screening']:.3f} с")
+    else:
+        print(f"verify_signatures со скринингом: {timings['screening']:.3f} с "
+              f"(при e = 65537 скрининг не применяется, подписи проверяются напрямую)")
\ No newline at end of file